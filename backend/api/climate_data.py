@@ -1,17 +1,24 @@
 from uuid import uuid4
-import time
-from datetime import datetime, timedelta
 from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.concurrency import run_in_threadpool
 from countries.cambodia import (
-    get_communes_geodataframe,
+    get_commune_row_positions,
     validate_location,
     get_all_provinces,
     get_districts_for_province,
     get_communes_for_district,
-    province_to_filename
+    get_communes_for_province,
+    commune_in_province
 )
-from celery_worker import data_task
+from celery_worker import data_task, storage_cleanup_task
 from utils.supabase_client import get_supabase_client
+from utils.download_files import download_file_path, download_request_hash
+from services.download_dedup import (
+    complete_attached_downloads,
+    complete_from_existing_file,
+    find_leading_download,
+    find_reusable_download
+)
 from models.weather_download import (
     WeatherDownloadRequest, 
     WeatherDownloadStatus
@@ -26,9 +33,6 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Load GeoDataFrame with communes
-communes_gdf = get_communes_geodataframe()
-
 async def get_current_user(authorization: str = Header(None)):
     """
     Extract user ID from Supabase JWT token.
@@ -84,6 +88,61 @@ async def get_current_user(authorization: str = Header(None)):
             detail=f"Authentication error: {str(e)}"
         )
 
+def _create_download(download_record: dict, dataset_label: str) -> dict:
+    """
+    Insert a weather_downloads row and complete, attach or dispatch it (blocking I/O).
+    
+    Args:
+        download_record: Row to insert
+        dataset_label: Dataset name used in the response message
+    
+    Returns:
+        dict: Submit response with download_id, status and message
+    """
+    supabase = get_supabase_client()
+    
+    # Identical requests (same canonical hash) share one retrieval
+    download_record["request_hash"] = download_request_hash(download_record)
+    
+    result = supabase.table("weather_downloads").insert(download_record).execute()
+    download = result.data[0]
+    download_id = download["id"]
+    
+    # Reuse the file of a completed identical download while it is still in storage
+    reusable = find_reusable_download(supabase, download_record["request_hash"])
+    if reusable:
+        try:
+            completed = complete_from_existing_file(supabase, download, download_file_path(reusable))
+            print(f"[INFO] Download {download_id} reused the file of download {reusable['id']}")
+            # Identical requests that attached to this row meanwhile complete with it
+            complete_attached_downloads(supabase, download_id, download_record["request_hash"], completed["file_path"])
+            return {
+                "download_id": download_id,
+                "status": "completed",
+                "message": f"{dataset_label} data is ready (identical to a previous download)."
+            }
+        except Exception as e:
+            print(f"[WARNING] Could not reuse the file of download {reusable['id']}: {str(e)}")
+    
+    # Attach to an identical download that is already in flight; it completes this row too
+    leader = find_leading_download(supabase, download_record["request_hash"])
+    if leader and leader["id"] != download_id:
+        print(f"[INFO] Download {download_id} attached to in-flight download {leader['id']}")
+        return {
+            "download_id": download_id,
+            "status": "queued",
+            "message": f"{dataset_label} data retrieval is already in progress for an identical request."
+        }
+    
+    # Start Celery task with download_id
+    data_task.delay(download_id)
+    
+    return {
+        "download_id": download_id,
+        "status": "queued",
+        "message": f"{dataset_label} data retrieval has been initiated."
+    }
+
 @router.post("/climate-data")
 async def submit_climate_data_request(
     request: WeatherDownloadRequest, 
@@ -109,10 +168,8 @@ async def submit_climate_data_request(
                 detail=f"Invalid province: {province}. Available provinces: {available_provinces}"
             )
         
-        # Get province GeoDataFrame using normalized name for file lookup
-        normalized_province = province_to_filename(province)
-        province_gdf = communes_gdf[communes_gdf["normalized_NAME_1"] == normalized_province]
-        if province_gdf.empty:
+        # Check the province has communes in the boundaries dataset (precomputed row index)
+        if not get_commune_row_positions(province):
             raise HTTPException(
                 status_code=404, 
                 detail=f"No communes found for province: {province}"
@@ -133,9 +190,8 @@ async def submit_climate_data_request(
                     detail=f"Invalid districts for province {province}: {invalid_districts}. Available districts: {available_districts}"
                 )
             
-            # Filter GeoDataFrame by districts (using canonical names from GeoJSON)
-            province_gdf = province_gdf[province_gdf["NAME_2"].isin(request.districts)]
-            if province_gdf.empty:
+            # Filter by districts (using canonical names from GeoJSON)
+            if not get_commune_row_positions(province, request.districts):
                 raise HTTPException(
                     status_code=404,
                     detail=f"No communes found for districts {request.districts} in province {province}"
@@ -165,55 +221,39 @@ async def submit_climate_data_request(
                         detail=f"Invalid communes for province {province} and districts {request.districts}: {invalid_communes}. Available communes: {available_communes}"
                     )
                 
-                # Filter GeoDataFrame by communes (using canonical names from GeoJSON)
-                province_gdf = province_gdf[province_gdf["NAME_3"].isin(request.communes)]
-                if province_gdf.empty:
+                # Filter by communes (using canonical names from GeoJSON)
+                if not get_commune_row_positions(province, request.districts, request.communes):
                     raise HTTPException(
                         status_code=404,
                         detail=f"No communes found for specified communes {request.communes} in province {province}"
                     )
         elif request.communes:
             # If communes provided but no districts, validate communes against all districts in province
-            # Note: This is less efficient but necessary for backward compatibility
-            invalid_communes = []
-            for c in request.communes:
-                # Check if commune exists in any district of the province
-                commune_found = False
-                districts = get_districts_for_province(province)
-                for d in districts:
-                    if validate_location(province, d, c):
-                        commune_found = True
-                        break
-                if not commune_found:
-                    invalid_communes.append(c)
+            invalid_communes = [c for c in request.communes if not commune_in_province(province, c)]
             
             if invalid_communes:
                 # Get all available communes for the province
-                available_communes = []
-                districts = get_districts_for_province(province)
-                for d in districts:
-                    available_communes.extend(get_communes_for_district(province, d))
+                available_communes = get_communes_for_province(province)
                 raise HTTPException(
                     status_code=404,
                     detail=f"Invalid communes for province {province}: {invalid_communes}. Available communes: {available_communes}"
                 )
             
-            # Filter GeoDataFrame by communes
-            province_gdf = province_gdf[province_gdf["NAME_3"].isin(request.communes)]
-            if province_gdf.empty:
+            # Filter by communes
+            if not get_commune_row_positions(province, communes=request.communes):
                 raise HTTPException(
                     status_code=404,
                     detail=f"No communes found for specified communes {request.communes} in province {province}"
                 )
     
     # Create database record
-    supabase = get_supabase_client()
     download_record = {
         "requested_by_user_id": current_user["id"],
         "dataset": request.dataset.value,
         "provinces": request.provinces,
         "date_start": request.date_start.isoformat(),
         "date_end": request.date_end.isoformat(),
+        "output_format": request.output_format.value,
         "status": WeatherDownloadStatus.QUEUED.value
     }
     
@@ -223,17 +263,8 @@ async def submit_climate_data_request(
     if request.communes:
         download_record["communes"] = request.communes
     
-    result = supabase.table("weather_downloads").insert(download_record).execute()
-    download_id = result.data[0]["id"]
-    
-    # Start Celery task with download_id
-    task = data_task.delay(download_id)
-    
-    return {
-        "download_id": download_id,
-        "status": "queued",
-        "message": f"{request.dataset.value.capitalize()} data retrieval has been initiated."
-    }
+    # Supabase and broker calls block, so they run off the event loop
+    return await run_in_threadpool(_create_download, download_record, request.dataset.value.capitalize())
 
 # Keep the old GET endpoint for backward compatibility (deprecated)
 @router.get("/climate-data")
@@ -276,93 +307,21 @@ async def cleanup_old_weather_files(
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Clean up weather data files older than 24 hours from Supabase storage.
+    Trigger a cleanup of weather data files older than 24 hours from Supabase storage.
     Deletes the files but keeps the database records.
-    """
-    supabase = get_supabase_client()
-    
-    # Calculate 24 hours ago
-    twenty_four_hours_ago = datetime.utcnow() - timedelta(hours=24)
     
+    The cleanup also runs periodically (celery beat); this endpoint only enqueues it.
+    The task result (GET /api/tasks/{task_id}) holds the cleanup metrics.
+    """
     try:
-        # Find all downloads older than 24 hours with file_url
-        result = supabase.table("weather_downloads")\
-            .select("*")\
-            .not_.is_("file_url", "null")\
-            .lt("created_at", twenty_four_hours_ago.isoformat())\
-            .execute()
-        
-        if not result.data:
-            return {
-                "message": "No old files to clean up",
-                "files_deleted": 0
-            }
-        
-        files_deleted = 0
-        files_failed = 0
-        
-        for download in result.data:
-            try:
-                # Reconstruct file path from download record
-                # Format: {user_id}/{provinces_str}_{dataset_type}_data_{date_start}_{date_end}_{download_id}.xlsx
-                user_id = download["requested_by_user_id"]
-                provinces_str = "_".join(download["provinces"])
-                dataset_type = download["dataset"]
-                date_start = download["date_start"].replace('-', '')
-                date_end = download["date_end"].replace('-', '')
-                download_id = download["id"]
-                
-                filename = f"{provinces_str}_{dataset_type}_data_{date_start}_{date_end}_{download_id}.xlsx"
-                file_path = f"{user_id}/{filename}"
-                
-                # Delete file from storage
-                try:
-                    storage_result = supabase.storage.from_("weather-data-downloads").remove([file_path])
-                    
-                    # Check if deletion was successful (Supabase returns a list of deleted file paths)
-                    if storage_result and len(storage_result) > 0:
-                        # Update record to remove file_url (set to null)
-                        supabase.table("weather_downloads")\
-                            .update({"file_url": None})\
-                            .eq("id", download_id)\
-                            .execute()
-                        
-                        files_deleted += 1
-                        print(f"[INFO] Deleted file: {file_path}")
-                    else:
-                        # File might not exist, but that's okay - still update the record
-                        supabase.table("weather_downloads")\
-                            .update({"file_url": None})\
-                            .eq("id", download_id)\
-                            .execute()
-                        
-                        files_deleted += 1
-                        print(f"[INFO] File not found (may have been deleted already): {file_path}, updated record")
-                except Exception as storage_error:
-                    # Even if file deletion fails, try to update the record
-                    try:
-                        supabase.table("weather_downloads")\
-                            .update({"file_url": None})\
-                            .eq("id", download_id)\
-                            .execute()
-                    except:
-                        pass
-                    
-                    files_failed += 1
-                    print(f"[WARNING] Failed to delete file {file_path}: {str(storage_error)}")
-                    
-            except Exception as e:
-                files_failed += 1
-                print(f"[ERROR] Error deleting file for download {download.get('id', 'unknown')}: {str(e)}")
-        
-        return {
-            "message": f"Cleanup completed. {files_deleted} files deleted, {files_failed} failed.",
-            "files_deleted": files_deleted,
-            "files_failed": files_failed
-        }
-        
+        task = await run_in_threadpool(storage_cleanup_task.delay)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error during cleanup: {str(e)}"
         )
+    
+    return {
+        "message": "Cleanup started.",
+        "task_id": task.id
+    }
@@ -0,0 +1,55 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from countries.cambodia import validate_location
+from services.climatology import get_climatology_preview
+
+router = APIRouter(
+    prefix="/api/climatology",
+    tags=["climatology"]
+)
+
+@router.get("/preview")
+def climatology_preview(
+    province: str,
+    district: str,
+    commune: str,
+    start_day: int,
+    end_day: int,
+    duration: int,
+    data_type: str = "precipitation",
+    peril_type: Optional[str] = None,
+    trigger: Optional[float] = None,
+    years: int = 30
+):
+    """
+    Historical rolling-value minima/maxima and payout frequency for a commune and window.
+
+    Served from the precomputed climatology tables, so it answers without starting a
+    Celery task. Windows and durations must be one of the precomputed standard values.
+
+    All location names must be in canonical format (with spaces preserved).
+    Example: province="Banteay Meanchey", district="Mongkol Borei", commune="Banteay Neang"
+    """
+    if not validate_location(province, district, commune):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid location: '{province}' / '{district}' / '{commune}'. Location must be in canonical format."
+        )
+
+    try:
+        return get_climatology_preview(
+            province=province,
+            district=district,
+            commune=commune,
+            data_type=data_type.lower(),
+            start_day=start_day,
+            end_day=end_day,
+            duration=duration,
+            peril_type=peril_type,
+            trigger=trigger,
+            weather_data_period=years
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
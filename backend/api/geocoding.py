@@ -0,0 +1,34 @@
+from typing import List
+from fastapi import APIRouter, HTTPException
+from schemas.geocode_schema import GeocodeRequest, GeocodeResult
+from services.geocoding import geocode_points
+
+router = APIRouter(
+    prefix="/api/geocode",
+    tags=["geocode"]
+)
+
+@router.post("", response_model=List[GeocodeResult])
+def geocode_endpoint(request: GeocodeRequest):
+    """
+    Map GPS coordinates (e.g., farmer plots) to canonical (province, district, commune) triples.
+
+    Returns one result per input point, in input order, with the climate column name
+    used by the premium calculations. Points outside every commune come back with
+    matched=false.
+    """
+    try:
+        matches = geocode_points([(point.longitude, point.latitude) for point in request.points])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Geocoding failed: {str(e)}")
+
+    return [
+        GeocodeResult(
+            id=point.id,
+            latitude=point.latitude,
+            longitude=point.longitude,
+            matched=match is not None,
+            **(match or {})
+        )
+        for point, match in zip(request.points, matches)
+    ]
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from celery_worker import insure_smart_optimize_task
 from countries.cambodia import validate_location
+from utils.task_status import get_task_state
 
 router = APIRouter(
     prefix="/api/insure-smart",
@@ -98,7 +100,8 @@ async def optimize_insure_smart(request: dict):
                             detail=f"Invalid province: '{province}'. Province must be in canonical format (e.g., 'Banteay Meanchey'). Available provinces: {available_provinces}"
                         )
         
-        task = insure_smart_optimize_task.delay(request)
+        # Publishing to the broker blocks, so it runs off the event loop
+        task = await run_in_threadpool(insure_smart_optimize_task.delay, request)
         return {"message": "Optimization started.", "task_id": task.id}
     except HTTPException:
         raise
@@ -107,30 +110,19 @@ async def optimize_insure_smart(request: dict):
 
 @router.get("/status/{task_id}")
 async def get_optimization_status(task_id: str):
-    from celery.result import AsyncResult
-    from celery_worker import celery_app
-    import time
+    # The result backend lookup blocks, so it runs off the event loop
+    task_state = await run_in_threadpool(get_task_state, task_id)
+    state, info = task_state["state"], task_state["info"]
     
-    task_result = AsyncResult(task_id, app=celery_app)
-    print(f"Task {task_id} state: {task_result.state}")
-    print(f"Task {task_id} info: {task_result.info}")
-    
-    # Add a small delay to ensure task result is available
-    if task_result.state == "STARTED":
-        time.sleep(0.1)  # Small delay to let task complete
-        task_result = AsyncResult(task_id, app=celery_app)  # Refresh result
-        print(f"Task {task_id} state after delay: {task_result.state}")
-    
-    if task_result.state == "PENDING":
+    if state == "PENDING":
         return {"task_id": task_id, "status": "Pending", "result": None}
-    elif task_result.state == "SUCCESS":
-        print(f"Task {task_id} completed successfully")
-        result = task_result.result
-        print(f"Task {task_id} result type: {type(result)}")
-        return {"task_id": task_id, "status": "SUCCESS", "result": result}
-    elif task_result.state == "STARTED":
+    elif state == "SUCCESS":
+        return {"task_id": task_id, "status": "SUCCESS", "result": info}
+    elif state in ("STARTED", "PROGRESS"):
         # Task is still running
-        return {"task_id": task_id, "status": "Pending", "result": None}
+        response = {"task_id": task_id, "status": "Pending", "result": None}
+        if state == "PROGRESS":
+            response["progress"] = info
+        return response
     else:
-        print(f"Task {task_id} failed with state: {task_result.state}")
-        return {"task_id": task_id, "status": "FAILURE", "result": str(task_result.info)} 
\ No newline at end of file
+        return {"task_id": task_id, "status": "FAILURE", "result": str(info)}
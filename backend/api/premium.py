@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from celery_worker import premium_task
 from schemas.premium_schema import PremiumRequest
 from services.premium_calculator import calculate_premium
@@ -13,7 +14,8 @@ async def calculate_premium_endpoint(request: PremiumRequest):
     try:
         # Convert Pydantic model to dict for Celery serialization
         request_dict = request.dict(by_alias=True)
-        task = premium_task.delay(request_dict)
+        # Publishing to the broker blocks, so it runs off the event loop
+        task = await run_in_threadpool(premium_task.delay, request_dict)
         return {
             "message": "Premium Calculation has been initiated.",
             "task_id": task.id
@@ -1,7 +1,13 @@
-from celery.result import AsyncResult
-from fastapi import APIRouter
-from celery_worker import celery_app
+import json
+import asyncio
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from utils.task_events import TERMINAL_STATES, subscribe, unsubscribe
+from utils.task_status import get_task_state, task_status_response
 
+# Seconds between keepalive comments on an idle event stream
+EVENT_STREAM_KEEPALIVE_SECONDS = 15
 
 # Set up the FastAPI router
 router = APIRouter(
@@ -18,24 +24,60 @@ async def get_task_status(task_id: str):
     Args:
     - task_id: The ID of the Celery task.
     """
-    task_result = AsyncResult(task_id, app=celery_app)
-
-    if task_result.state == "PENDING":
-        # Task is still in progress
-        response = {"task_id": task_id, "status": "Pending", "result": None}
-    elif task_result.state == "SUCCESS":
-        # Task is completed successfully
-        response = {
-            "task_id": task_id,
-            "status": task_result.state,
-            "result": task_result.result,
-        }
-    else:
-        # Task failed
-        response = {
-            "task_id": task_id,
-            "status": "Failure",
-            "result": str(task_result.info),  # This will contain the error message
-        }
-
-    return response
+    # The result backend lookup blocks, so it runs off the event loop
+    task_state = await run_in_threadpool(get_task_state, task_id)
+    return task_status_response(task_id, task_state["state"], task_state["info"])
+
+
+def _sse(payload: dict) -> str:
+    return f"event: status\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+@router.get("/{task_id}/events")
+async def stream_task_status(task_id: str, request: Request):
+    """
+    Stream the status of a Celery task as Server-Sent Events.
+
+    Sends the current status first, then one "status" event per state change (pushed
+    from the Celery event stream, no polling), and closes after the final status.
+    Idle streams get a keepalive comment every EVENT_STREAM_KEEPALIVE_SECONDS, after
+    re-checking the stored state so a missed final event still closes the stream.
+    Payloads match GET /api/tasks/{task_id}, which remains the polling fallback.
+    Args:
+    - task_id: The ID of the Celery task.
+    """
+    async def events():
+        # Subscribe before reading the current state so no transition is missed
+        queue = subscribe(task_id)
+        try:
+            task_state = await run_in_threadpool(get_task_state, task_id)
+            yield _sse(task_status_response(task_id, task_state["state"], task_state["info"]))
+            if task_state["state"] in TERMINAL_STATES:
+                return
+
+            while not await request.is_disconnected():
+                try:
+                    update = await asyncio.wait_for(queue.get(), timeout=EVENT_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # The final event may have been missed (e.g. while the receiver reconnected)
+                    task_state = await run_in_threadpool(get_task_state, task_id)
+                    if task_state["state"] in TERMINAL_STATES:
+                        yield _sse(task_status_response(task_id, task_state["state"], task_state["info"]))
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+
+                if update["state"] in TERMINAL_STATES:
+                    # Events only carry a repr of the result; send the stored result instead
+                    task_state = await run_in_threadpool(get_task_state, task_id)
+                    yield _sse(task_status_response(task_id, task_state["state"], task_state["info"]))
+                    return
+                yield _sse(task_status_response(task_id, update["state"], update["info"]))
+        finally:
+            unsubscribe(task_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
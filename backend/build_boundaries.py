@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Commune Boundaries Build Step
+Pre-serialises the commune boundaries GeoJSON to GeoParquet so API and worker
+processes don't parse GeoJSON at startup. Re-run whenever the GeoJSON changes.
+"""
+
+import os
+import logging
+from countries.cambodia import write_communes_geoparquet
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    if not os.path.isdir("boundaries"):
+        print("Error: Please run this script from the backend directory")
+        exit(1)
+    
+    output_file = write_communes_geoparquet()
+    logger.info(f"✓ Wrote {output_file} ({os.path.getsize(output_file)} bytes)")
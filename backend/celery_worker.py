@@ -10,12 +10,24 @@ from services.premium_calculator import calculate_premium
 from schemas.premium_schema import PremiumRequest
 from utils.gee_utils import initialize_gee
 from utils.gee_utils_local import initialize_gee_local
-from weather.precipitation import retrieve_precipitation_data
-from weather.temperature import retrieve_temperature_data
+from weather.datasets import DATASETS, format_output_values, retrieve_dataset
+from weather.store_planner import retrieve_with_climate_store
+from utils.download_files import DOWNLOAD_FORMATS, download_filename, join_unit_frames, write_download_file
+from services.storage_cleanup import cleanup_expired_downloads
+from services.download_dedup import complete_attached_downloads, fail_attached_downloads
+from utils.progress import ProgressReporter, get_download_dispatch, init_download_progress, record_download_dispatch
+from utils.checkpoints import (
+    checkpointed_retrieval,
+    clear_checkpoints,
+    clear_stale_checkpoints,
+    load_unit_result,
+    save_unit_result
+)
 from countries.cambodia import (
-    get_communes_geodataframe,
     validate_location,
-    province_to_filename
+    commune_in_province,
+    get_commune_row_positions,
+    select_communes_geodataframe
 )
 from io import BytesIO
 from dotenv import load_dotenv
@@ -30,7 +42,7 @@ load_dotenv()
 
 # Import the new modules at the top level with error handling
 try:
-    from utils.supabase_client import get_supabase_client
+    from utils.supabase_client import get_supabase_client, reset_supabase_client
     from models.weather_download import WeatherDownloadStatus
     print("[DEBUG] Successfully imported new modules at top level")
 except ImportError as e:
@@ -41,9 +53,6 @@ except ImportError as e:
 celery_app = Celery("tasks")
 celery_app.config_from_object("celeryconfig")
 
-# Load GeoDataFrame with communes
-communes_gdf = get_communes_geodataframe()
-
 # Create files directory if it doesn't exist
 os.makedirs(os.path.join(os.getcwd(), "files"), exist_ok=True)
 
@@ -62,6 +71,9 @@ def init_worker(**kwargs):
     os.chdir(backend_dir)
     print(f"[DEBUG] Changed working directory to: {backend_dir}")
     
+    # Never share the parent's Supabase connections with a forked child
+    reset_supabase_client()
+    
     if os.getenv("ENV") == "LOCAL":
         print("[DEBUG] Initializing GEE with local credentials")
         initialize_gee_local()
@@ -71,48 +83,215 @@ def init_worker(**kwargs):
     
     print("[DEBUG] Worker initialization completed")
 
+# Upper bound on communes per retrieval subtask; larger provinces are split by district
+DOWNLOAD_UNIT_MAX_COMMUNES = int(os.getenv("DOWNLOAD_UNIT_MAX_COMMUNES", "200"))
+
+
+def _ensure_gee_initialized():
+    # Initialize GEE if needed
+    print(f"[INFO] Initializing Google Earth Engine...")
+    # Check if GEE is already initialized (safe for all versions)
+    if not getattr(ee.data, '_credentials', None):
+        try:
+            if os.getenv("ENV") == "LOCAL":
+                initialize_gee_local()
+            else:
+                initialize_gee()
+        except Exception:
+            # Already initialized, ignore
+            pass
+    print(f"[INFO] Google Earth Engine initialized successfully")
+
+
+def _fetch_download_record(supabase, download_id: str) -> dict:
+    """Load a weather_downloads row or raise if it does not exist."""
+    print(f"[INFO] Fetching download record for ID: {download_id}")
+    result = supabase.table("weather_downloads")\
+        .select("*")\
+        .eq("id", download_id)\
+        .execute()
+    
+    if not result.data:
+        raise Exception(f"Download record not found: {download_id}")
+    return result.data[0]
+
+
+def _mark_download_failed(supabase, download_id: str, error: Exception, error_traceback=None):
+    """Log a failed download, mark its row failed and drop its checkpoints."""
+    import traceback
+    error_message = str(error)
+    
+    print(f"[ERROR] Data retrieval failed for download_id: {download_id}")
+    print(f"[ERROR] Error: {error_message}")
+    print(f"[ERROR] Traceback: {error_traceback or traceback.format_exc()}")
+    
+    # Update status to failed with detailed error information
+    try:
+        supabase.table("weather_downloads")\
+            .update({
+                "status": WeatherDownloadStatus.FAILED.value,
+                "error_message": error_message,
+                "updated_at": "now()"
+            })\
+            .eq("id", download_id)\
+            .execute()
+        
+        # Identical requests that attached to this download fail with it
+        result = supabase.table("weather_downloads")\
+            .select("request_hash")\
+            .eq("id", download_id)\
+            .execute()
+        if result.data:
+            fail_attached_downloads(supabase, download_id, result.data[0].get("request_hash"), error_message)
+    except Exception as db_error:
+        print(f"[ERROR] Failed to update database with error status: {str(db_error)}")
+    
+    # The download is marked failed and will not be retried, so its checkpoints are not needed
+    clear_checkpoints(download_id)
+
+
+def _validate_download_province(province: str, districts, communes):
+    """Validate a province and its optional district/commune filters; raise on invalid input."""
+    # Validate province using canonical location data (e.g., "Banteay Meanchey")
+    if not validate_location(province):
+        from countries.cambodia import get_all_provinces
+        available_provinces = get_all_provinces()
+        raise Exception(
+            f"Invalid province: '{province}'. "
+            f"Province must be in canonical format (e.g., 'Banteay Meanchey'). "
+            f"Available provinces: {available_provinces}"
+        )
+
+    # Check the province has communes in the boundaries dataset (precomputed row index)
+    if not get_commune_row_positions(province):
+        raise Exception(f"Province not found in dataset: {province}")
+
+    # Filter by districts if provided
+    if districts:
+        # Validate districts using canonical location data (e.g., "Mongkol Borei")
+        for d in districts:
+            if not validate_location(province, d):
+                from countries.cambodia import get_districts_for_province
+                available_districts = get_districts_for_province(province)
+                raise Exception(
+                    f"Invalid district: '{d}' in province '{province}'. "
+                    f"District must be in canonical format. "
+                    f"Available districts for {province}: {available_districts}"
+                )
+
+        # Districts are stored with their canonical names (may have spaces)
+        if not get_commune_row_positions(province, districts):
+            raise Exception(f"No communes found for districts {districts} in province {province}")
+        print(f"[INFO] Filtered to {len(districts)} district(s): {districts}")
+
+    # Filter by communes if provided
+    if communes:
+        # Validate communes using canonical location data
+        # If districts are provided, validate commune against those districts
+        if districts:
+            for c in communes:
+                commune_found = False
+                for d in districts:
+                    if validate_location(province, d, c):
+                        commune_found = True
+                        break
+                if not commune_found:
+                    from countries.cambodia import get_communes_for_district
+                    available_communes = []
+                    for d in districts:
+                        available_communes.extend(get_communes_for_district(province, d))
+                    raise Exception(
+                        f"Invalid commune: '{c}' in province '{province}', districts {districts}. "
+                        f"Commune must be in canonical format. "
+                        f"Available communes: {available_communes}"
+                    )
+        else:
+            # If no districts, check commune exists in any district of the province
+            for c in communes:
+                if not commune_in_province(province, c):
+                    from countries.cambodia import get_communes_for_province
+                    available_communes = get_communes_for_province(province)
+                    raise Exception(
+                        f"Invalid commune: '{c}' in province '{province}'. "
+                        f"Commune must be in canonical format. "
+                        f"Available communes: {available_communes}"
+                    )
+
+        # Communes are stored with their canonical names (may have spaces)
+        if not get_commune_row_positions(province, districts, communes):
+            raise Exception(f"No communes found for specified communes {communes} in province {province}")
+        print(f"[INFO] Filtered to {len(communes)} commune(s): {communes}")
+
+
+def _plan_download_units(download_record: dict) -> list:
+    """
+    Split a download into retrieval units: one per province, or several district chunks
+    of at most DOWNLOAD_UNIT_MAX_COMMUNES communes for large provinces.
+    
+    Units are listed in output column order (provinces in request order, districts in
+    dataset order).
+    """
+    districts = download_record.get("districts")
+    communes = download_record.get("communes")
+    
+    units = []
+    for province in download_record["provinces"]:
+        _validate_download_province(province, districts, communes)
+        
+        province_gdf = select_communes_geodataframe(province, districts, communes)
+        if communes or len(province_gdf) <= DOWNLOAD_UNIT_MAX_COMMUNES:
+            units.append({"province": province, "districts": districts, "communes": communes, "n_communes": len(province_gdf)})
+            continue
+        
+        # Chunk whole districts so each unit stays under the commune limit
+        district_sizes = province_gdf["NAME_2"].value_counts(sort=False)
+        chunk, chunk_size = [], 0
+        for district in province_gdf["NAME_2"].unique():
+            if chunk and chunk_size + district_sizes[district] > DOWNLOAD_UNIT_MAX_COMMUNES:
+                units.append({"province": province, "districts": chunk, "communes": None, "n_communes": chunk_size})
+                chunk, chunk_size = [], 0
+            chunk.append(district)
+            chunk_size += int(district_sizes[district])
+        units.append({"province": province, "districts": chunk, "communes": None, "n_communes": chunk_size})
+    return units
+
+
 @celery_app.task(name="data_task", bind=True)
 def data_task(self, download_id: str):
     """
     Enhanced Celery task for processing weather data downloads.
     
+    Validates the request and fans it out as a chord: one retrieve_download_unit_task
+    per province (or district chunk) in parallel, followed by assemble_download_task,
+    which formats, writes and uploads the file. If any of them fails, download_failed_task
+    (the chord's error callback) marks the download failed once all units have finished.
+    
+    The task is acknowledged late, so it can be redelivered after it dispatched the
+    chord; a download that already finished or has a dispatched chord is skipped.
+    
     Args:
         download_id (str): The UUID of the download record in Supabase
         
     Returns:
-        dict: Task result with status and file information
+        dict: Task result with the dispatched units
     """
-    # Log task execution for debugging
-    import uuid
-    import traceback
-    task_id = str(uuid.uuid4())[:8]  # Generate a short task ID for logging
-    print(f"[INFO] Starting data_task: {task_id} for download_id: {download_id}")
-    
-    # Debug information
-    print(f"[DEBUG] Current working directory: {os.getcwd()}")
-    print(f"[DEBUG] Python path: {sys.path[:3]}...")
-    print(f"[DEBUG] Backend directory: {os.path.dirname(os.path.abspath(__file__))}")
-    
-    # Import additional modules needed for the task
-    import tempfile
-    import time
+    from celery import chord, group
     
-    # Use the top-level imports that were already loaded
-    print("[DEBUG] Using top-level imports for Supabase client and models")
+    print(f"[INFO] Starting data_task for download_id: {download_id}")
     supabase = get_supabase_client()
     
     try:
-        # Get download record with validation
-        print(f"[INFO] Fetching download record for ID: {download_id}")
-        result = supabase.table("weather_downloads")\
-            .select("*")\
-            .eq("id", download_id)\
-            .execute()
+        download_record = _fetch_download_record(supabase, download_id)
         
-        if not result.data:
-            raise Exception(f"Download record not found: {download_id}")
+        # Redelivered after the chord was dispatched (or the download already finished)
+        if download_record["status"] in (WeatherDownloadStatus.COMPLETED.value, WeatherDownloadStatus.FAILED.value):
+            print(f"[INFO] Download {download_id} is already {download_record['status']}, nothing to dispatch")
+            return {"status": download_record["status"], "units": 0}
+        dispatched_chord = get_download_dispatch(download_id)
+        if dispatched_chord:
+            print(f"[INFO] Download {download_id} was already dispatched (chord {dispatched_chord}), not dispatching again")
+            return {"status": "dispatched", "chord_id": dispatched_chord}
         
-        download_record = result.data[0]
         print(f"[INFO] Processing {download_record['dataset']} data for provinces: {download_record['provinces']}")
         
         # Update status to running
@@ -121,193 +300,181 @@ def data_task(self, download_id: str):
             .eq("id", download_id)\
             .execute()
         
-        # Initialize GEE if needed
-        print(f"[INFO] Initializing Google Earth Engine...")
-        # Check if GEE is already initialized (safe for all versions)
-        if not getattr(ee.data, '_credentials', None):
-            try:
-                if os.getenv("ENV") == "LOCAL":
-                    initialize_gee_local()
-                else:
-                    initialize_gee()
-            except Exception:
-                # Already initialized, ignore
-                pass
-        print(f"[INFO] Google Earth Engine initialized successfully")
+        if download_record["dataset"] not in DATASETS:
+            raise Exception(f"Unsupported dataset type: {download_record['dataset']}")
         
-        # Process each province with progress tracking
-        all_data = pd.DataFrame()
-        total_provinces = len(download_record["provinces"])
+        # Drop checkpoints of downloads whose worker died and that were never redelivered
+        removed = clear_stale_checkpoints()
+        if removed:
+            print(f"[INFO] Removed {removed} stale checkpoint folder(s)")
         
-        for i, province in enumerate(download_record["provinces"]):
-            print(f"[INFO] Processing province {i+1}/{total_provinces}: {province}")
-            
-            # Validate province using canonical location data (e.g., "Banteay Meanchey")
-            if not validate_location(province):
-                from countries.cambodia import get_all_provinces
-                available_provinces = get_all_provinces()
-                raise Exception(
-                    f"Invalid province: '{province}'. "
-                    f"Province must be in canonical format (e.g., 'Banteay Meanchey'). "
-                    f"Available provinces: {available_provinces}"
-                )
-            
-            # Get province GeoDataFrame using normalized name for file lookup
-            normalized_province = province_to_filename(province)
-            province_gdf = communes_gdf[communes_gdf["normalized_NAME_1"] == normalized_province]
-            if province_gdf.empty:
-                raise Exception(f"Province not found in dataset: {province}")
-            
-            # Filter by districts if provided
-            districts = download_record.get("districts")
-            if districts:
-                # Validate districts using canonical location data (e.g., "Mongkol Borei")
-                for d in districts:
-                    if not validate_location(province, d):
-                        from countries.cambodia import get_districts_for_province
-                        available_districts = get_districts_for_province(province)
-                        raise Exception(
-                            f"Invalid district: '{d}' in province '{province}'. "
-                            f"District must be in canonical format. "
-                            f"Available districts for {province}: {available_districts}"
-                        )
-                
-                # Districts are stored with their canonical names (may have spaces)
-                province_gdf = province_gdf[province_gdf["NAME_2"].isin(districts)]
-                if province_gdf.empty:
-                    raise Exception(f"No communes found for districts {districts} in province {province}")
-                print(f"[INFO] Filtered to {len(districts)} district(s): {districts}")
-            
-            # Filter by communes if provided
-            communes = download_record.get("communes")
-            if communes:
-                # Validate communes using canonical location data
-                # If districts are provided, validate commune against those districts
-                if districts:
-                    for c in communes:
-                        commune_found = False
-                        for d in districts:
-                            if validate_location(province, d, c):
-                                commune_found = True
-                                break
-                        if not commune_found:
-                            from countries.cambodia import get_communes_for_district
-                            available_communes = []
-                            for d in districts:
-                                available_communes.extend(get_communes_for_district(province, d))
-                            raise Exception(
-                                f"Invalid commune: '{c}' in province '{province}', districts {districts}. "
-                                f"Commune must be in canonical format. "
-                                f"Available communes: {available_communes}"
-                            )
-                else:
-                    # If no districts, check commune exists in any district of the province
-                    for c in communes:
-                        commune_found = False
-                        from countries.cambodia import get_districts_for_province
-                        all_districts = get_districts_for_province(province)
-                        for d in all_districts:
-                            if validate_location(province, d, c):
-                                commune_found = True
-                                break
-                        if not commune_found:
-                            from countries.cambodia import get_districts_for_province, get_communes_for_district
-                            available_communes = []
-                            all_districts = get_districts_for_province(province)
-                            for d in all_districts:
-                                available_communes.extend(get_communes_for_district(province, d))
-                            raise Exception(
-                                f"Invalid commune: '{c}' in province '{province}'. "
-                                f"Commune must be in canonical format. "
-                                f"Available communes: {available_communes}"
-                            )
-                
-                # Communes are stored with their canonical names (may have spaces)
-                province_gdf = province_gdf[province_gdf["NAME_3"].isin(communes)]
-                if province_gdf.empty:
-                    raise Exception(f"No communes found for specified communes {communes} in province {province}")
-                print(f"[INFO] Filtered to {len(communes)} commune(s): {communes}")
-            
-            # Retrieve data based on dataset type
-            start_time = time.time()
-            if download_record["dataset"] == "precipitation":
-                province_data = retrieve_precipitation_data(
-                    province_gdf, 
-                    download_record["date_start"], 
-                    download_record["date_end"]
-                )
-            elif download_record["dataset"] == "temperature":
-                province_data = retrieve_temperature_data(
-                    province_gdf, 
-                    download_record["date_start"], 
-                    download_record["date_end"]
+        units = _plan_download_units(download_record)
+        print(f"[INFO] Dispatching {len(units)} retrieval unit(s) for download_id: {download_id}")
+        
+        # Shared progress counters, measured in commune-days across all units
+        total_communes = sum(unit["n_communes"] for unit in units)
+        total_days = (pd.Timestamp(download_record["date_end"]) - pd.Timestamp(download_record["date_start"])).days
+        try:
+            init_download_progress(download_id, total_communes, total_communes * max(0, total_days), len(units))
+        except Exception as progress_error:
+            print(f"[WARNING] Failed to initialise progress for download {download_id}: {str(progress_error)}")
+        
+        # Failures of the units or the assembly are handled once, after every unit finished
+        callback = assemble_download_task.s(download_id).on_error(download_failed_task.s(download_id))
+        result = chord(
+            group(
+                retrieve_download_unit_task.s(
+                    download_id,
+                    download_record["dataset"],
+                    download_record["date_start"],
+                    download_record["date_end"],
+                    unit
                 )
-            else:
-                raise Exception(f"Unsupported dataset type: {download_record['dataset']}")
-            
-            processing_time = time.time() - start_time
-            print(f"[INFO] Retrieved {len(province_data)} records for {province} in {processing_time:.2f}s")
-            
-            # Merge data
-            if all_data.empty:
-                all_data = province_data
-            else:
-                all_data = pd.merge(all_data, province_data, on="Date", how="outer")
+                for unit in units
+            )
+        )(callback)
+        try:
+            record_download_dispatch(download_id, result.id)
+        except Exception as dispatch_error:
+            print(f"[WARNING] Failed to record the dispatch of download {download_id}: {str(dispatch_error)}")
+        
+        return {"status": "dispatched", "units": len(units), "chord_id": result.id}
+    
+    except Exception as e:
+        _mark_download_failed(supabase, download_id, e)
+        # Re-raise the original exception for Celery to handle
+        raise e
+
+
+@celery_app.task(name="retrieve_download_unit_task", bind=True)
+def retrieve_download_unit_task(self, download_id: str, dataset: str, date_start: str, date_end: str, unit: dict):
+    """
+    Retrieve one province (or district chunk) of a weather download.
+    
+    With a shared CHECKPOINT_DIR the unit's frame is stored as Parquet beside the
+    download's checkpoints and only its path goes through the result backend; otherwise
+    the frame itself does (see save_unit_result). Failures are left to the chord's error
+    callback (download_failed_task), so sibling units keep running.
+    
+    Returns:
+        dict: {"province": ...} plus the frame reference (Date column first)
+    """
+    import time
+    
+    province = unit["province"]
+    try:
+        _ensure_gee_initialized()
         
+        # Take the selected rows (with geometries) from the lazily-loaded boundaries
+        province_gdf = select_communes_geodataframe(province, unit["districts"], unit["communes"])
+        
+        days = (pd.Timestamp(date_end) - pd.Timestamp(date_start)).days
+        progress = ProgressReporter(download_id, len(province_gdf), len(province_gdf) * max(0, days), task=self)
+        progress.start()
+        
+        def retrieve_batch(gdf, start, end):
+            batch_start = time.time()
+            batch_df = retrieve_dataset(gdf, start, end, dataset)
+            batch_days = (pd.Timestamp(end) - pd.Timestamp(start)).days
+            progress.batch_done(len(gdf), len(gdf) * batch_days, time.time() - batch_start)
+            return batch_df
+        
+        start_time = time.time()
+        # Fetched chunks are checkpointed per download, so a redelivered task resumes
+        retrieve = checkpointed_retrieval(
+            retrieve_batch,
+            download_id,
+            f"{dataset}|{province}"
+        )
+        
+        # Answer from the local climate store where it has the data; only gaps go to GEE
+        unit_data = retrieve_with_climate_store(
+            province,
+            province_gdf,
+            dataset,
+            date_start,
+            date_end,
+            retrieve
+        )
+        
+        progress.unit_done()
+        
+        processing_time = time.time() - start_time
+        print(f"[INFO] Retrieved {len(unit_data)} records for {province} ({len(province_gdf)} communes) in {processing_time:.2f}s")
+        unit_key = f"{dataset}|{province}|{unit['districts']}|{unit['communes']}"
+        return {"province": province, **save_unit_result(download_id, unit_key, unit_data)}
+    
+    except Exception as e:
+        import traceback
+        print(f"[ERROR] Retrieval unit {province} failed for download_id: {download_id}: {str(e)}")
+        print(f"[ERROR] Traceback: {traceback.format_exc()}")
+        raise e
+
+
+@celery_app.task(name="assemble_download_task")
+def assemble_download_task(unit_results: list, download_id: str):
+    """
+    Join the unit results of a weather download, then format, write and upload the file.
+    
+    Failures are handled by the chord's error callback (download_failed_task).
+    
+    Args:
+        unit_results (list): Results of retrieve_download_unit_task (frame references), in unit order
+        download_id (str): The UUID of the download record in Supabase
+        
+    Returns:
+        dict: Task result with status and file information
+    """
+    import tempfile
+    import time
+    
+    supabase = get_supabase_client()
+    
+    try:
+        download_record = _fetch_download_record(supabase, download_id)
+        
+        # Align all units on Date in a single outer join (colliding commune names get their province)
+        all_data = join_unit_frames([
+            (result["province"], load_unit_result(result))
+            for result in unit_results
+        ])
         print(f"[INFO] Total records processed: {len(all_data)}")
         
-        # Format data based on dataset type before creating file
+        # Format data based on dataset type before creating file (whole columns at once)
         print(f"[INFO] Formatting {download_record['dataset']} data...")
-        if download_record["dataset"] == "precipitation":
-            # Format precipitation: 2 decimals, values < 1 mm set to 0
-            for col in all_data.columns:
-                if col != 'Date':
-                    all_data[col] = all_data[col].apply(
-                        lambda x: 0.0 if pd.notna(x) and float(x) < 1.0 
-                        else round(float(x), 2) if pd.notna(x) 
-                        else x
-                    )
-            print(f"[INFO] Precipitation data formatted: 2 decimals, values < 1 mm set to 0")
-        elif download_record["dataset"] == "temperature":
-            # Format temperature: 1 decimal
-            for col in all_data.columns:
-                if col != 'Date':
-                    all_data[col] = all_data[col].apply(
-                        lambda x: round(float(x), 1) if pd.notna(x) 
-                        else x
-                    )
-            print(f"[INFO] Temperature data formatted: 1 decimal")
+        all_data = format_output_values(all_data, download_record["dataset"])
         
         # Validate data before creating file
         if all_data.empty:
             raise Exception("No data retrieved for the specified parameters")
         
         # Create temporary file with better error handling
-        print(f"[INFO] Creating Excel file...")
+        output_format = download_record.get("output_format") or "xlsx"
+        print(f"[INFO] Creating {output_format} file...")
         temp_file_path = None
         try:
-            with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as temp_file:
-                all_data.to_excel(temp_file.name, index=False, engine="openpyxl")
+            extension = DOWNLOAD_FORMATS[output_format]["extension"]
+            with tempfile.NamedTemporaryFile(suffix=f".{extension}", delete=False) as temp_file:
                 temp_file_path = temp_file.name
+            # Written straight from the assembled columns; xlsx rows are streamed to keep memory flat
+            write_download_file(all_data, temp_file_path, output_format)
             
-            # Generate descriptive filename
-            provinces_str = "_".join(download_record['provinces'])
-            dataset_type = download_record['dataset']
-            date_start = download_record['date_start'].replace('-', '')
-            date_end = download_record['date_end'].replace('-', '')
-            
-            # Create descriptive filename: Province_DatasetType_StartDate_EndDate_DownloadID.xlsx
-            filename = f"{provinces_str}_{dataset_type}_data_{date_start}_{date_end}_{download_id}.xlsx"
+            # Descriptive filename: Province_DatasetType_StartDate_EndDate_DownloadID.<extension>
+            filename = download_filename(download_record)
             file_path = f"{download_record['requested_by_user_id']}/{filename}"
             print(f"[INFO] Uploading file to Supabase storage: {file_path}")
             
             max_retries = 3
             for attempt in range(max_retries):
                 try:
+                    # Upload from the open file so it is streamed rather than read into memory
                     with open(temp_file_path, "rb") as f:
-                        file_content = f.read()
+                        # Upsert so a redelivered task can replace a file uploaded before the crash
                         supabase.storage.from_("weather-data-downloads").upload(
-                            file_path, file_content
+                            file_path, f, file_options={
+                                "upsert": "true",
+                                "content-type": DOWNLOAD_FORMATS[output_format]["content_type"]
+                            }
                         )
                     print(f"[INFO] File uploaded successfully on attempt {attempt + 1}")
                     break
@@ -340,46 +507,77 @@ def data_task(self, download_id: str):
             .update({
                 "status": WeatherDownloadStatus.COMPLETED.value,
                 "file_url": signed_url,
+                "file_path": file_path,
                 "updated_at": "now()"
             })\
             .eq("id", download_id)\
             .execute()
         
+        # Identical requests that attached while this one was in flight get their own copy
+        complete_attached_downloads(supabase, download_id, download_record.get("request_hash"), file_path)
+        
+        clear_checkpoints(download_id)
         print(f"[INFO] Data retrieval completed successfully for download_id: {download_id}")
         print(f"[INFO] Generated filename: {filename}")
         return {
             "status": "completed", 
             "file_url": file_path,
             "filename": filename,
+            "output_format": output_format,
             "signed_url": signed_url,
             "records_processed": len(all_data),
             "provinces_processed": len(download_record["provinces"])
         }
         
+    
     except Exception as e:
-        error_message = str(e)
-        error_traceback = traceback.format_exc()
-        
-        print(f"[ERROR] Data retrieval failed for download_id: {download_id}")
-        print(f"[ERROR] Error: {error_message}")
-        print(f"[ERROR] Traceback: {error_traceback}")
-        
-        # Update status to failed with detailed error information
-        try:
-            supabase.table("weather_downloads")\
-                .update({
-                    "status": WeatherDownloadStatus.FAILED.value,
-                    "error_message": error_message,
-                    "updated_at": "now()"
-                })\
-                .eq("id", download_id)\
-                .execute()
-        except Exception as db_error:
-            print(f"[ERROR] Failed to update database with error status: {str(db_error)}")
-        
-        # Re-raise the original exception for Celery to handle
+        import traceback
+        print(f"[ERROR] Assembling download {download_id} failed: {str(e)}")
+        print(f"[ERROR] Traceback: {traceback.format_exc()}")
         raise e
 
+
+@celery_app.task(name="download_failed_task")
+def download_failed_task(request, exc, traceback, download_id: str):
+    """
+    Error callback of a download chord: mark the download (and attached ones) failed.
+    
+    Celery calls it once, after every unit has finished, when a unit or the assembly
+    failed. Only then are the checkpoints and stored unit results dropped.
+    
+    Args:
+        request: Request of the failed task
+        exc: The exception raised
+        traceback: Traceback of the failure
+        download_id (str): The UUID of the download record in Supabase
+    """
+    _mark_download_failed(get_supabase_client(), download_id, exc, traceback)
+
+@celery_app.task(name="climatology_rebuild_task")
+def climatology_rebuild_task(normalized_province: str, data_type: str):
+    """
+    Rebuild a province's climatology table after its climate store file changed.
+    
+    Enqueued by climate store write-backs; several write-backs of one province lead to
+    a single rebuild, since an up-to-date table is skipped.
+    
+    Returns:
+        dict: Whether the table was rebuilt
+    """
+    from services.climatology import rebuild_climatology_if_outdated
+    return {"rebuilt": rebuild_climatology_if_outdated(normalized_province, data_type)}
+
+
+@celery_app.task(name="storage_cleanup_task")
+def storage_cleanup_task():
+    """
+    Periodic cleanup of expired download files (scheduled by celery beat, see celeryconfig).
+    
+    Returns:
+        dict: Cleanup metrics
+    """
+    return cleanup_expired_downloads()
+
 @celery_app.task(name="premium_task")
 def premium_task(request_dict):
     # Log task execution for debugging
@@ -63,8 +63,21 @@ imports = ('celery_worker',)
 # Task routing and discovery
 task_routes = {
     'data_task': {'queue': 'celery'},
+    'retrieve_download_unit_task': {'queue': 'celery'},
+    'assemble_download_task': {'queue': 'celery'},
+    'download_failed_task': {'queue': 'celery'},
     'premium_task': {'queue': 'celery'},
     'insure_smart_optimize_task': {'queue': 'celery'},
+    'storage_cleanup_task': {'queue': 'celery'},
+    'climatology_rebuild_task': {'queue': 'celery'},
+}
+
+# Periodic tasks (run with: celery -A celery_worker.celery_app beat)
+beat_schedule = {
+    'storage-cleanup': {
+        'task': 'storage_cleanup_task',
+        'schedule': float(os.getenv("CLEANUP_INTERVAL_SECONDS", "3600")),
+    },
 }
 
 # Disable auto-discovery to prevent random task execution
@@ -149,6 +149,12 @@ if __name__ == "__main__":
     print("\n=== Validation ===")
     validate_parquet_files()
     
+    print("\n=== Climatology Tables ===")
+    from services.climatology import build_climatology_tables
+    for data_type in ("precipitation", "temperature"):
+        tables_written = build_climatology_tables(data_type)
+        logger.info(f"Built {tables_written} {data_type} climatology tables")
+    
     print("\n=== Next Steps ===")
     print("1. Update _get_weather_data() in insure_smart_premium_calc.py")
     print("2. Test the new Parquet format")
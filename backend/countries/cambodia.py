@@ -1,11 +1,23 @@
-import geopandas as gpd
 import os
 import json
+import hashlib
+import threading
 from typing import Optional, Tuple, Dict, List
 
 # Cache for location data from JSON
 _location_data_cache: Optional[Dict] = None
 
+# Compiled lookup index over the location data (see _get_location_index)
+_location_index_cache: Optional[Dict] = None
+
+# Process-wide cache for commune boundaries, keyed by use_updated.
+# geopandas is imported lazily so processes that never touch geometries don't pay for it.
+_communes_gdf_cache: Dict[bool, object] = {}
+_communes_gdf_lock = threading.Lock()
+
+# Hierarchical row index over the commune boundaries (see _get_communes_row_index)
+_communes_row_index_cache: Optional[Dict] = None
+
 def _load_location_data() -> Dict:
     """Load and cache location data from JSON file."""
     global _location_data_cache
@@ -16,6 +28,61 @@ def _load_location_data() -> Dict:
     return _location_data_cache
 
 
+def _get_location_index() -> Dict:
+    """
+    Build (once) and return hashed lookup tables over the canonical location data.
+    
+    Every lookup used for validation and column-name conversion becomes a dict or
+    frozenset membership test, so per-request cost no longer grows with country size.
+    The precomputed lists keep the JSON order and are used for "available options"
+    in error messages.
+    """
+    global _location_index_cache
+    if _location_index_cache is None:
+        locations = _load_location_data()
+        provinces = list(locations.keys())
+        districts_by_province = {}
+        communes_by_district = {}
+        communes_by_province = {}
+        triples = set()
+        column_to_location = {}
+        location_to_column = {}
+        filename_to_province = {}
+        
+        for province, districts in locations.items():
+            filename_to_province.setdefault(province_to_filename(province), province)
+            districts_by_province[province] = list(districts.keys())
+            province_communes = []
+            for district, communes in districts.items():
+                communes_by_district[(province, district)] = communes
+                province_communes.extend(communes)
+                for commune in communes:
+                    location = (province, district, commune)
+                    column_name = to_climate_column_name(district, commune)
+                    triples.add(location)
+                    location_to_column[location] = column_name
+                    # First match wins, as in the original province/district scan
+                    column_to_location.setdefault(column_name, location)
+            communes_by_province[province] = province_communes
+        
+        _location_index_cache = {
+            "provinces": provinces,
+            "province_set": frozenset(provinces),
+            "district_set": frozenset(communes_by_district.keys()),
+            "location_set": frozenset(triples),
+            "province_commune_sets": {
+                province: frozenset(communes) for province, communes in communes_by_province.items()
+            },
+            "districts_by_province": districts_by_province,
+            "communes_by_district": communes_by_district,
+            "communes_by_province": communes_by_province,
+            "column_to_location": column_to_location,
+            "location_to_column": location_to_column,
+            "filename_to_province": filename_to_province,
+        }
+    return _location_index_cache
+
+
 def normalize_province_name(name: str) -> str:
     """
     Normalize province names for Cambodia by removing special characters,
@@ -124,21 +191,30 @@ def validate_location(province: str, district: Optional[str] = None, commune: Op
     Returns:
         True if location exists, False otherwise
     """
-    locations = _load_location_data()
-    
-    if province not in locations:
-        return False
+    index = _get_location_index()
     
     if district is None:
-        return True
-    
-    if district not in locations[province]:
-        return False
+        return province in index["province_set"]
     
     if commune is None:
-        return True
+        return (province, district) in index["district_set"]
     
-    return commune in locations[province][district]
+    return (province, district, commune) in index["location_set"]
+
+
+def commune_in_province(province: str, commune: str) -> bool:
+    """
+    Check whether a commune exists in any district of a province.
+    
+    Args:
+        province: Province name in canonical format (e.g., "Banteay Meanchey")
+        commune: Commune name in canonical format (e.g., "Banteay Neang")
+    
+    Returns:
+        True if the commune exists in the province, False otherwise
+    """
+    province_communes = _get_location_index()["province_commune_sets"].get(province)
+    return province_communes is not None and commune in province_communes
 
 
 def province_to_filename(province: str) -> str:
@@ -194,56 +270,122 @@ def from_climate_column_name(column_name: str) -> Optional[Tuple[str, str, str]]
         Tuple of (province, district, commune) in canonical format, or None if not found
         Example: ("Banteay Meanchey", "Mongkol Borei", "Banteay Neang")
     """
-    locations = _load_location_data()
-    
-    # Split column name into district and commune parts
-    parts = column_name.split("_", 1)
-    if len(parts) != 2:
-        return None
-    
-    district_formatted, commune_formatted = parts
+    return _get_location_index()["column_to_location"].get(column_name)
+
+
+def filename_to_province(filename: str) -> Optional[str]:
+    """
+    Convert filename format back to the canonical province name.
+    Example: "BanteayMeanchey" → "Banteay Meanchey"
     
-    # Search through all provinces and districts to find matching names
-    for province, districts in locations.items():
-        for district, communes in districts.items():
-            district_match = district.replace(" ", "") == district_formatted
-            commune_match = commune_formatted in [c.replace(" ", "") for c in communes]
-            
-            if district_match and commune_match:
-                # Find the exact commune name
-                for commune in communes:
-                    if commune.replace(" ", "") == commune_formatted:
-                        return (province, district, commune)
+    Args:
+        filename: Province name without spaces (e.g., "BanteayMeanchey")
     
-    return None
+    Returns:
+        Province name in canonical format, or None if not found
+    """
+    return _get_location_index()["filename_to_province"].get(filename)
 
 
 def get_all_provinces() -> List[str]:
     """Get list of all province names in canonical format."""
-    locations = _load_location_data()
-    return list(locations.keys())
+    return _get_location_index()["provinces"]
 
 
 def get_districts_for_province(province: str) -> List[str]:
     """Get list of all district names for a province in canonical format."""
-    locations = _load_location_data()
-    if province not in locations:
-        return []
-    return list(locations[province].keys())
+    return _get_location_index()["districts_by_province"].get(province, [])
 
 
 def get_communes_for_district(province: str, district: str) -> List[str]:
     """Get list of all commune names for a district in canonical format."""
-    locations = _load_location_data()
-    if province not in locations or district not in locations[province]:
-        return []
-    return locations[province][district]
+    return _get_location_index()["communes_by_district"].get((province, district), [])
+
+
+def get_communes_for_province(province: str) -> List[str]:
+    """Get list of all commune names across every district of a province in canonical format."""
+    return _get_location_index()["communes_by_province"].get(province, [])
+
+
+def _boundaries_path(filename: str) -> str:
+    """Path of a file in the boundaries directory."""
+    return os.path.join(os.getcwd(), "boundaries", filename)
+
+
+def _communes_geojson_path(use_updated: bool = True) -> str:
+    """GeoJSON source file for commune boundaries."""
+    if use_updated:
+        geojson_file = _boundaries_path("cambodia_communes_updated.geojson")
+        # Fallback to original if updated doesn't exist
+        if not os.path.exists(geojson_file):
+            geojson_file = _boundaries_path("cambodia_communes.geojson")
+        return geojson_file
+    return _boundaries_path("cambodia_communes.geojson")
+
+
+def _communes_geoparquet_path(geojson_file: str) -> str:
+    """Pre-serialised GeoParquet artifact built from a GeoJSON boundaries file."""
+    return os.path.splitext(geojson_file)[0] + ".parquet"
+
+
+def _file_sha1(path: str) -> str:
+    """SHA-1 of a file's contents."""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _geoparquet_is_current(geoparquet_file: str, geojson_file: str) -> bool:
+    """
+    Whether a GeoParquet artifact was built from the current GeoJSON source.
+
+    The source hash is stored in the Parquet metadata, so this does not depend on
+    file modification times (which git checkouts don't preserve).
+    """
+    if not os.path.exists(geoparquet_file):
+        return False
+    if not os.path.exists(geojson_file):
+        return True
+    import pyarrow.parquet as pq
+    metadata = pq.read_schema(geoparquet_file).metadata or {}
+    return metadata.get(b"source_sha1", b"").decode() == _file_sha1(geojson_file)
+
+
+def _read_communes_geodataframe(use_updated: bool = True):
+    """
+    Read commune boundaries from disk.
+
+    Uses the GeoParquet artifact written by write_communes_geoparquet() when it was
+    built from the current GeoJSON, and parses the GeoJSON otherwise.
+    """
+    import geopandas as gpd
+
+    geojson_file = _communes_geojson_path(use_updated)
+    geoparquet_file = _communes_geoparquet_path(geojson_file)
+
+    try:
+        if _geoparquet_is_current(geoparquet_file, geojson_file):
+            communes_gdf = gpd.read_parquet(geoparquet_file)
+        else:
+            communes_gdf = gpd.read_file(geojson_file)
+        
+        # Add normalized_NAME_1 column for backward compatibility during migration
+        # This converts canonical province names back to filename format
+        if "normalized_NAME_1" not in communes_gdf.columns:
+            communes_gdf["normalized_NAME_1"] = communes_gdf["NAME_1"].apply(
+                province_to_filename
+            )
+    except Exception as e:
+        raise RuntimeError(f"Error reading commune boundaries: {str(e)}")
+    return communes_gdf
 
 
 def get_communes_geodataframe(use_updated: bool = True):
     """
     Load the GeoDataFrame for Cambodia's communes.
     
+    Boundaries are read once per process on first use and shared by every caller,
+    so the returned GeoDataFrame must not be mutated.
+    
     Args:
         use_updated: If True, use the updated GeoJSON with canonical names.
                     If False, use the original GeoJSON (for backward compatibility).
@@ -253,23 +395,143 @@ def get_communes_geodataframe(use_updated: bool = True):
         are in canonical format. A normalized_NAME_1 column is added for backward
         compatibility during migration.
     """
-    if use_updated:
-        geojson_file = os.path.join(os.getcwd(), "boundaries", "cambodia_communes_updated.geojson")
-        # Fallback to original if updated doesn't exist
-        if not os.path.exists(geojson_file):
-            geojson_file = os.path.join(os.getcwd(), "boundaries", "cambodia_communes.geojson")
-    else:
-        geojson_file = os.path.join(os.getcwd(), "boundaries", "cambodia_communes.geojson")
+    communes_gdf = _communes_gdf_cache.get(use_updated)
+    if communes_gdf is not None:
+        return communes_gdf
     
-    try:
-        communes_gdf = gpd.read_file(geojson_file)
+    with _communes_gdf_lock:
+        if use_updated not in _communes_gdf_cache:
+            _communes_gdf_cache[use_updated] = _read_communes_geodataframe(use_updated)
+        return _communes_gdf_cache[use_updated]
+
+
+def write_communes_geoparquet(use_updated: bool = True) -> str:
+    """
+    Build step: pre-serialise the commune boundaries GeoJSON to GeoParquet.
+    
+    Reading the binary artifact is several times faster than parsing the GeoJSON,
+    and get_communes_geodataframe() picks it up automatically.
+    
+    Returns:
+        Path of the written GeoParquet file
+    """
+    import geopandas as gpd
+    import pyarrow.parquet as pq
+
+    geojson_file = _communes_geojson_path(use_updated)
+    geoparquet_file = _communes_geoparquet_path(geojson_file)
+    communes_gdf = gpd.read_file(geojson_file)
+    communes_gdf.to_parquet(geoparquet_file, index=False)
+    
+    # Record the source hash so readers can tell whether the artifact is stale
+    table = pq.read_table(geoparquet_file)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"source_sha1"] = _file_sha1(geojson_file).encode()
+    pq.write_table(table.replace_schema_metadata(metadata), geoparquet_file)
+    return geoparquet_file
+
+
+def _get_communes_row_index() -> Dict:
+    """
+    Build (once) and return the province → district → commune → row positions index.
+    
+    Positions refer to rows of get_communes_geodataframe(). The index is built from
+    the attribute columns of the GeoParquet artifact when it is current, so it does
+    not require loading geometries (or geopandas).
+    """
+    global _communes_row_index_cache
+    if _communes_row_index_cache is None:
+        with _communes_gdf_lock:
+            geojson_file = _communes_geojson_path()
+            geoparquet_file = _communes_geoparquet_path(geojson_file)
+            if _geoparquet_is_current(geoparquet_file, geojson_file):
+                import pandas as pd
+                names = pd.read_parquet(geoparquet_file, columns=["NAME_1", "NAME_2", "NAME_3"])
+            else:
+                names = None
+        if names is None:
+            names = get_communes_geodataframe()[["NAME_1", "NAME_2", "NAME_3"]]
         
-        # Add normalized_NAME_1 column for backward compatibility during migration
-        # This converts canonical province names back to filename format
-        if "normalized_NAME_1" not in communes_gdf.columns:
-            communes_gdf["normalized_NAME_1"] = communes_gdf["NAME_1"].apply(
-                province_to_filename
-            )
-    except Exception as e:
-        raise RuntimeError(f"Error reading GeoJSON file: {str(e)}")
-    return communes_gdf
+        row_index = {}
+        for position, (province, district, commune) in enumerate(
+            zip(names["NAME_1"].tolist(), names["NAME_2"].tolist(), names["NAME_3"].tolist())
+        ):
+            row_index.setdefault(province_to_filename(province), {})\
+                .setdefault(district, {})\
+                .setdefault(commune, [])\
+                .append(position)
+        _communes_row_index_cache = row_index
+    return _communes_row_index_cache
+
+
+def get_commune_row_positions(
+    province: str,
+    districts: Optional[List[str]] = None,
+    communes: Optional[List[str]] = None
+) -> List[int]:
+    """
+    Row positions in get_communes_geodataframe() for a province selection.
+    
+    Equivalent to masking on normalized_NAME_1, then NAME_2.isin(districts), then
+    NAME_3.isin(communes), but answered from the precomputed index.
+    
+    Args:
+        province: Province name in canonical format (e.g., "Banteay Meanchey")
+        districts: Optional district names in canonical format
+        communes: Optional commune names in canonical format (matched in any selected district)
+    
+    Returns:
+        Sorted list of row positions (empty if nothing matches)
+    """
+    province_index = _get_communes_row_index().get(province_to_filename(province), {})
+    selected_districts = province_index.keys() if not districts else districts
+    
+    positions = []
+    for district in selected_districts:
+        district_index = province_index.get(district, {})
+        selected_communes = district_index.keys() if not communes else communes
+        for commune in selected_communes:
+            positions.extend(district_index.get(commune, []))
+    return sorted(set(positions))
+
+
+def select_communes_geodataframe(
+    province: str,
+    districts: Optional[List[str]] = None,
+    communes: Optional[List[str]] = None
+):
+    """
+    Select commune rows (with geometries) for a province, optionally filtered by districts and communes.
+    
+    Args:
+        province: Province name in canonical format (e.g., "Banteay Meanchey")
+        districts: Optional district names in canonical format
+        communes: Optional commune names in canonical format (matched in any selected district)
+    
+    Returns:
+        GeoDataFrame with the selected rows, in dataset order
+    """
+    positions = get_commune_row_positions(province, districts, communes)
+    return get_communes_geodataframe().take(positions)
+
+
+def ordered_communes(province_gdf) -> List[Tuple[str, object]]:
+    """
+    List (climate column name, geometry) for every commune, grouped by district.
+    
+    This is the column order of the weather retrieval results.
+    
+    Args:
+        province_gdf: GeoDataFrame with NAME_2, NAME_3 and geometry columns
+    
+    Returns:
+        List of (column_name, geometry) tuples
+    """
+    communes = []
+    for district in province_gdf["NAME_2"].unique():
+        district_communes = province_gdf[province_gdf["NAME_2"] == district]
+        for district_name, commune_name, geometry in zip(
+            district_communes["NAME_2"], district_communes["NAME_3"], district_communes.geometry
+        ):
+            communes.append((to_climate_column_name(district_name, commune_name), geometry))
+    return communes
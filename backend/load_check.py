@@ -0,0 +1,90 @@
+"""
+Concurrent polling load test for the task status endpoints.
+
+Simulates many users polling task status and reports throughput and latency
+percentiles per endpoint. Run it against a running API (with
+its Redis / Celery backend) before and after changes to the async handlers:
+
+    python load_check.py --base-url http://localhost:8000 --task-id <id> --concurrency 200 --duration 30
+
+A blocked event loop shows up as p99 latency growing with --concurrency, even for
+endpoints that do almost no work.
+"""
+import argparse
+import asyncio
+import time
+import httpx
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def poll(client, url, deadline, latencies, errors, interval):
+    """Request url repeatedly until the deadline, recording latencies (seconds)."""
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        try:
+            response = await client.get(url)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+            else:
+                latencies.append(time.monotonic() - start)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        if interval:
+            await asyncio.sleep(interval)
+
+
+async def run(args):
+    endpoints = {
+        "root": "/",
+        "task_status": f"/api/tasks/{args.task_id}",
+        "insure_smart_status": f"/api/insure-smart/status/{args.task_id}",
+    }
+    results = {name: ([], []) for name in endpoints}
+    deadline = time.monotonic() + args.duration
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        workers = []
+        for i in range(args.concurrency):
+            name = list(endpoints)[i % len(endpoints)]
+            latencies, errors = results[name]
+            workers.append(poll(client, endpoints[name], deadline, latencies, errors, args.interval))
+        started = time.monotonic()
+        await asyncio.gather(*workers)
+        elapsed = time.monotonic() - started
+
+    print(f"Concurrency: {args.concurrency}, duration: {elapsed:.1f}s, poll interval: {args.interval}s")
+    print(f"{'endpoint':<22}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    total = 0
+    for name, (latencies, errors) in results.items():
+        total += len(latencies)
+        p50, p95, p99 = (percentile(latencies, f) for f in (0.50, 0.95, 0.99))
+        print(
+            f"{name:<22}{len(latencies):>10}{len(latencies) / elapsed:>10.1f}"
+            f"{(p50 or 0) * 1000:>10.1f}{(p95 or 0) * 1000:>10.1f}{(p99 or 0) * 1000:>10.1f}{len(errors):>8}"
+        )
+    print(f"Total throughput: {total / elapsed:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent polling load test for the task status endpoints")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--task-id", default="00000000-0000-0000-0000-000000000000",
+                        help="Task ID to poll (an unknown ID is reported as pending)")
+    parser.add_argument("--concurrency", type=int, default=100, help="Concurrent pollers")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--interval", type=float, default=0.0, help="Pause between polls of one poller (seconds)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Request timeout (seconds)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,10 @@ from utils.settings import origins
 from api.premium import router as premium_router
 from dotenv import load_dotenv
 from api.insure_smart import router as insure_smart_router
+from api.climatology import router as climatology_router
+from api.geocoding import router as geocoding_router
+from utils.task_events import start_receiver
+from services.climatology import prepare_climatology_tables
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -18,6 +22,10 @@ async def lifespan(app: FastAPI):
         initialize_gee_local()
     else:
         initialize_gee()
+    # Listen for Celery task events before the first status stream subscribes
+    start_receiver()
+    # Build missing or outdated climatology tables off the request path
+    prepare_climatology_tables()
     yield
     print("Shutting down...")
 
@@ -43,6 +51,8 @@ app.include_router(climate_data_router)
 app.include_router(task_router)
 app.include_router(premium_router)
 app.include_router(insure_smart_router)
+app.include_router(climatology_router)
+app.include_router(geocoding_router)
 
 @app.get("/")
 async def root():
@@ -16,6 +16,13 @@ class WeatherDownloadStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+class WeatherDownloadFormat(str, Enum):
+    """Enumeration for weather download file formats."""
+    XLSX = "xlsx"
+    PARQUET = "parquet"
+    CSV_GZ = "csv.gz"
+    ARROW = "arrow"
+
 class WeatherDownloadRequest(BaseModel):
     """
     Request model for weather data download.
@@ -24,6 +31,9 @@ class WeatherDownloadRequest(BaseModel):
     (e.g., "Banteay Meanchey" with spaces preserved).
     
     If communes are provided, districts must also be provided.
+    
+    output_format selects the file type; Excel sheets are limited to 16,384 columns,
+    so wide (e.g. country-wide commune) downloads should use parquet or csv.gz.
     """
     dataset: WeatherDatasetType
     provinces: List[str]
@@ -31,6 +41,7 @@ class WeatherDownloadRequest(BaseModel):
     date_end: date
     districts: Optional[List[str]] = None
     communes: Optional[List[str]] = None
+    output_format: WeatherDownloadFormat = WeatherDownloadFormat.XLSX
     
     @field_validator('provinces')
     @classmethod
@@ -126,6 +137,8 @@ class WeatherDownloadResponse(BaseModel):
     id: str
     status: WeatherDownloadStatus
     file_url: Optional[str] = None
+    file_path: Optional[str] = None
+    output_format: WeatherDownloadFormat = WeatherDownloadFormat.XLSX
     error_message: Optional[str] = None
     created_at: str
     updated_at: str
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# Upper bound on points per request, to keep a single call bounded in time and memory
+MAX_GEOCODE_POINTS = 50000
+
+class GeocodePoint(BaseModel):
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+    id: Optional[str] = None
+
+class GeocodeRequest(BaseModel):
+    points: List[GeocodePoint] = Field(max_length=MAX_GEOCODE_POINTS)
+
+class GeocodeResult(BaseModel):
+    id: Optional[str] = None
+    latitude: float
+    longitude: float
+    matched: bool
+    province: Optional[str] = None
+    district: Optional[str] = None
+    commune: Optional[str] = None
+    climate_column: Optional[str] = None
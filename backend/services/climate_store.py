@@ -0,0 +1,154 @@
+import os
+import hashlib
+import threading
+import pandas as pd
+from typing import Optional, Tuple
+
+# Module-level cache for climate data frames.
+# Keyed by (normalized_province, data_type); values are (DataFrame, data_version).
+_climate_data_cache = {}
+_cache_lock = threading.Lock()
+
+
+def clear_climate_data_cache():
+    """Clear the in-memory climate data cache."""
+    with _cache_lock:
+        _climate_data_cache.clear()
+
+
+def get_parquet_path(normalized_province: str, data_type: str) -> str:
+    """Path of the columnar climate store file for a province and data type."""
+    return os.path.join(os.getcwd(), "climate_data", data_type, "Cambodia", f"{normalized_province}.parquet")
+
+
+def get_excel_path(normalized_province: str, data_type: str) -> str:
+    """Path of the legacy Excel file for a province and data type."""
+    return os.path.join(os.getcwd(), "files", data_type, "Cambodia", f"{normalized_province}.xlsx")
+
+
+def get_file_version(path: str) -> Optional[str]:
+    """
+    Short version string for a data file, or None if it does not exist.
+
+    Derived from the file name, size and modification time, so it costs a single
+    stat() call and changes whenever the file is rewritten.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    fingerprint = f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:12]
+
+
+def _resolve_source(normalized_province: str, data_type: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Find the file backing a province's climate data and its current version.
+
+    Returns:
+        Tuple of (path, version), or (None, None) if no file exists
+    """
+    for path in (get_parquet_path(normalized_province, data_type), get_excel_path(normalized_province, data_type)):
+        version = get_file_version(path)
+        if version is not None:
+            return path, version
+    return None, None
+
+
+def load_climate_data_with_version(normalized_province: str, data_type: str) -> Tuple[pd.DataFrame, str]:
+    """
+    Load (and cache) the daily climate frame for a province, with its data version.
+
+    Every access checks the backing file's version; if the file was replaced since it
+    was cached, only this province/data type is reloaded. Other cached frames are kept.
+
+    Args:
+        normalized_province: Province name in filename format (e.g., "BanteayMeanchey")
+        data_type: "precipitation" or "temperature"
+
+    Returns:
+        Tuple of (DataFrame, data_version)
+
+    Raises:
+        FileNotFoundError: If neither a Parquet nor an Excel file exists
+    """
+    key = (normalized_province, data_type)
+    path, version = _resolve_source(normalized_province, data_type)
+    if path is None:
+        _climate_data_cache.pop(key, None)
+        raise FileNotFoundError(
+            f"No climate data file found for {normalized_province} ({data_type}). "
+            f"Tried: {get_parquet_path(normalized_province, data_type)} and "
+            f"{get_excel_path(normalized_province, data_type)}"
+        )
+
+    cached = _climate_data_cache.get(key)
+    if cached is not None and cached[1] == version:
+        return cached
+
+    with _cache_lock:
+        # Another thread may have reloaded while we waited for the lock
+        cached = _climate_data_cache.get(key)
+        if cached is not None and cached[1] == version:
+            return cached
+        if cached is not None:
+            print(f"Climate data changed on disk for {normalized_province} ({data_type}), reloading")
+
+        if path.endswith(".parquet"):
+            print(f"Loading Parquet file: {path}")
+            df = pd.read_parquet(path, memory_map=True)
+        else:
+            # Fallback to Excel (old format)
+            print(f"Loading Excel file (fallback): {path}")
+            df = pd.read_excel(path, parse_dates=['Date'])
+
+        _climate_data_cache[key] = (df, version)
+        return df, version
+
+
+def load_climate_data(normalized_province: str, data_type: str) -> pd.DataFrame:
+    """
+    Load (and cache) the daily climate frame for a province.
+
+    Reads the memory-mapped Parquet store in climate_data/<data_type>/Cambodia/ and
+    falls back to files/<data_type>/Cambodia/<province>.xlsx when no Parquet file exists.
+    The returned frame is shared between callers and must not be mutated.
+
+    Args:
+        normalized_province: Province name in filename format (e.g., "BanteayMeanchey")
+        data_type: "precipitation" or "temperature"
+
+    Returns:
+        DataFrame with a 'Date' column and one column per commune
+
+    Raises:
+        FileNotFoundError: If neither a Parquet nor an Excel file exists
+    """
+    df, _ = load_climate_data_with_version(normalized_province, data_type)
+    return df
+
+
+def resolve_commune_column(columns, commune: str) -> Optional[str]:
+    """
+    Find the climate column of a commune given by name only.
+
+    The legacy Excel files name columns by commune ("Angkaol"); the Parquet store uses
+    "District_Commune" ("DamnakChang'aeur_Angkaol"). An exact match wins; otherwise
+    the column whose commune part matches (spaces removed) is used. When a commune name
+    occurs in several districts, the first column is taken, as with the Excel files.
+
+    Args:
+        columns: Column names of a province frame
+        commune: Commune name as sent by the frontend (e.g., "Angkaol")
+
+    Returns:
+        The column name, or None if the commune is not in the frame
+    """
+    if commune in columns:
+        return commune
+
+    suffix = "_" + commune.replace(" ", "")
+    matches = [c for c in columns if isinstance(c, str) and c.endswith(suffix) and len(c) > len(suffix)]
+    if len(matches) > 1:
+        print(f"[WARNING] Commune '{commune}' matches several columns {matches}; using {matches[0]}")
+    return matches[0] if matches else None
@@ -0,0 +1,338 @@
+import os
+import glob
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Any
+from countries.cambodia import province_to_filename, to_climate_column_name
+from services.climate_store import load_climate_data_with_version, get_file_version, get_parquet_path
+from services.rolling_windows import phase_window_extremes
+
+# Standard coverage windows as (start_day, end_day) offsets from Jan 1, inclusive.
+# Same convention as the InsureSmart periods: calendar months and quarters of a non-leap year.
+_MONTH_STARTS = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334, 365]
+STANDARD_WINDOWS = (
+    [(_MONTH_STARTS[m], _MONTH_STARTS[m + 1] - 1) for m in range(12)]
+    + [(_MONTH_STARTS[q], _MONTH_STARTS[q + 3] - 1) for q in (0, 3, 6, 9)]
+)
+
+# Standard consecutive-day durations for rolling index values
+STANDARD_DURATIONS = [1, 3, 5, 7, 10, 15, 20, 30]
+
+# Perils whose trigger fires below the threshold (use the yearly minimum)
+LOW_PERILS = {"LRI", "LTI"}
+
+# Module-level cache for climatology tables.
+# Keyed by (normalized_province, data_type); values are (version, {column: DataFrame}).
+_climatology_cache = {}
+_cache_lock = threading.Lock()
+_build_lock = threading.Lock()
+
+# Tables being rebuilt by this process, keyed by (normalized_province, data_type)
+_rebuilding = set()
+
+
+def get_climatology_path(normalized_province: str, data_type: str) -> str:
+    """Path of the precomputed climatology table for a province and data type."""
+    return os.path.join(os.getcwd(), "climate_data", "climatology", data_type, "Cambodia", f"{normalized_province}.parquet")
+
+
+def build_climatology_table(df: pd.DataFrame, data_type: str) -> pd.DataFrame:
+    """
+    Compute the critical rolling values for every commune, year, window and duration.
+
+    Precipitation uses rolling sums; temperature uses rolling averages with -999
+    "no data" values dropped, matching the InsureSmart premium calculation.
+
+    Args:
+        df: Daily climate frame with a 'Date' column and one column per commune
+        data_type: "precipitation" or "temperature"
+
+    Returns:
+        DataFrame with columns: column, year, start_day, end_day, duration, min_value, max_value
+    """
+    dates = df['Date'].to_numpy(dtype="datetime64[ns]")
+    years = sorted(pd.DatetimeIndex(dates).year.unique().tolist())
+    columns = [col for col in df.columns if col != 'Date']
+
+    # One entry per (standard window, year); windows shorter than a duration come back invalid
+    window_years = np.array([year for _ in STANDARD_WINDOWS for year in years])
+    window_start_days = np.array([start_day for start_day, _ in STANDARD_WINDOWS for _ in years])
+    window_end_days = np.array([end_day for _, end_day in STANDARD_WINDOWS for _ in years])
+    starts = [datetime(int(year), 1, 1) + timedelta(days=int(day)) for year, day in zip(window_years, window_start_days)]
+    ends = [datetime(int(year), 1, 1) + timedelta(days=int(day)) for year, day in zip(window_years, window_end_days)]
+
+    frames = []
+    for column in columns:
+        values = df[column].to_numpy(dtype=np.float64)
+        column_dates = dates
+        if data_type == "temperature":
+            keep = values != -999
+            values = values[keep]
+            column_dates = dates[keep]
+
+        # Stack every (window, year) pair so each duration is one kernel call
+        for duration in STANDARD_DURATIONS:
+            min_values, valid = phase_window_extremes(column_dates, values, starts, ends, duration, "min")
+            max_values, _ = phase_window_extremes(column_dates, values, starts, ends, duration, "max")
+            if data_type == "temperature":
+                min_values = min_values / duration
+                max_values = max_values / duration
+            frames.append(pd.DataFrame({
+                "column": column,
+                "year": window_years[valid],
+                "start_day": window_start_days[valid],
+                "end_day": window_end_days[valid],
+                "duration": duration,
+                "min_value": min_values[valid],
+                "max_value": max_values[valid],
+            }))
+
+    if not frames:
+        return pd.DataFrame(columns=["column", "year", "start_day", "end_day", "duration", "min_value", "max_value"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_province_climatology(normalized_province: str, data_type: str) -> str:
+    """
+    Build and write the climatology table of one province from its climate store file.
+
+    The table gets the modification time of the store file it was built from, so a
+    rewritten store file (e.g. a write-back) marks it as outdated.
+
+    Returns:
+        Path of the written table
+    """
+    # Stat before reading: if the store is replaced meanwhile, the table is rebuilt again
+    source_mtime_ns = os.stat(get_parquet_path(normalized_province, data_type)).st_mtime_ns
+    df, _ = load_climate_data_with_version(normalized_province, data_type)
+    table = build_climatology_table(df, data_type)
+
+    output_path = get_climatology_path(normalized_province, data_type)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    table.to_parquet(temp_path, index=False, compression='snappy')
+    os.utime(temp_path, ns=(source_mtime_ns, source_mtime_ns))
+    os.replace(temp_path, output_path)
+    print(f"[INFO] Climatology table written: {output_path} ({len(table)} rows)")
+    return output_path
+
+
+def build_climatology_tables(data_type: str) -> int:
+    """
+    Build climatology tables for every province in the climate store of a data type.
+
+    Run as part of data ingestion, after the Parquet store has been refreshed. Tables
+    are generated files (not kept in git); missing or outdated ones are also rebuilt in
+    the background at API startup (see prepare_climatology_tables).
+
+    Returns:
+        Number of province tables written
+    """
+    parquet_dir = os.path.join(os.getcwd(), "climate_data", data_type, "Cambodia")
+    written = 0
+    for parquet_file in sorted(glob.glob(os.path.join(parquet_dir, "*.parquet"))):
+        normalized_province = os.path.splitext(os.path.basename(parquet_file))[0]
+        build_province_climatology(normalized_province, data_type)
+        written += 1
+    return written
+
+
+def rebuild_climatology_if_outdated(normalized_province: str, data_type: str) -> bool:
+    """
+    Rebuild a province's climatology table if it is missing or outdated.
+
+    Skipped while another thread of this process rebuilds the same table.
+
+    Returns:
+        True if the table was rebuilt
+    """
+    key = (normalized_province, data_type)
+    with _build_lock:
+        if key in _rebuilding or not _climatology_outdated(normalized_province, data_type):
+            return False
+        _rebuilding.add(key)
+    try:
+        build_province_climatology(normalized_province, data_type)
+        return True
+    finally:
+        with _build_lock:
+            _rebuilding.discard(key)
+
+
+def _rebuild_in_background(normalized_province: str, data_type: str):
+    """Rebuild an outdated table in a thread; previews keep serving the current table meanwhile."""
+    def run():
+        try:
+            rebuild_climatology_if_outdated(normalized_province, data_type)
+        except Exception as e:
+            print(f"[WARNING] Failed to rebuild climatology table for {normalized_province} ({data_type}): {str(e)}")
+
+    threading.Thread(target=run, name=f"climatology-{normalized_province}-{data_type}", daemon=True).start()
+
+
+def schedule_climatology_rebuild(normalized_province: str, data_type: str):
+    """
+    Rebuild a province's climatology table after its climate store file changed.
+
+    The rebuild runs as a Celery task (a thread if the broker is unavailable); previews
+    keep serving the current table until the new one replaces it.
+    """
+    try:
+        from celery_worker import climatology_rebuild_task
+        climatology_rebuild_task.delay(normalized_province, data_type)
+    except Exception as e:
+        print(f"[WARNING] Failed to enqueue climatology rebuild for {normalized_province} ({data_type}): {str(e)}")
+        _rebuild_in_background(normalized_province, data_type)
+
+
+def prepare_climatology_tables(data_types=("precipitation", "temperature")) -> threading.Thread:
+    """
+    Build missing or outdated climatology tables in a background thread (at API startup).
+
+    Returns:
+        The started thread
+    """
+    def run():
+        for data_type in data_types:
+            parquet_dir = os.path.join(os.getcwd(), "climate_data", data_type, "Cambodia")
+            for parquet_file in sorted(glob.glob(os.path.join(parquet_dir, "*.parquet"))):
+                normalized_province = os.path.splitext(os.path.basename(parquet_file))[0]
+                try:
+                    rebuild_climatology_if_outdated(normalized_province, data_type)
+                except Exception as e:
+                    print(f"[WARNING] Failed to build climatology table for {normalized_province} ({data_type}): {str(e)}")
+
+    thread = threading.Thread(target=run, name="climatology-prepare", daemon=True)
+    thread.start()
+    return thread
+
+
+def _climatology_outdated(normalized_province: str, data_type: str) -> bool:
+    """True if the climatology table is missing or was not built from the current store file."""
+    path = get_climatology_path(normalized_province, data_type)
+    source_path = get_parquet_path(normalized_province, data_type)
+    try:
+        built_from = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return os.path.exists(source_path)
+    try:
+        return os.stat(source_path).st_mtime_ns != built_from
+    except FileNotFoundError:
+        return False
+
+
+def _load_climatology(normalized_province: str, data_type: str) -> Dict[str, pd.DataFrame]:
+    """
+    Load (and cache) a province's climatology table, grouped by climate column.
+
+    An outdated table is served while it is rebuilt in the background. A missing table
+    (requested before prepare_climatology_tables reached it) is built inline.
+    """
+    key = (normalized_province, data_type)
+    path = get_climatology_path(normalized_province, data_type)
+    if not os.path.exists(path):
+        if os.path.exists(get_parquet_path(normalized_province, data_type)):
+            build_province_climatology(normalized_province, data_type)
+    elif _climatology_outdated(normalized_province, data_type):
+        _rebuild_in_background(normalized_province, data_type)
+    version = get_file_version(path)
+    if version is None:
+        raise FileNotFoundError(f"No climatology table found for {normalized_province} ({data_type}): {path}")
+
+    cached = _climatology_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _cache_lock:
+        cached = _climatology_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        table = pd.read_parquet(path, memory_map=True)
+        by_column = {column: group.reset_index(drop=True) for column, group in table.groupby("column", sort=False)}
+        _climatology_cache[key] = (version, by_column)
+        return by_column
+
+
+def get_climatology_preview(
+    province: str,
+    district: str,
+    commune: str,
+    data_type: str,
+    start_day: int,
+    end_day: int,
+    duration: int,
+    peril_type: Optional[str] = None,
+    trigger: Optional[float] = None,
+    weather_data_period: int = 30
+) -> Dict[str, Any]:
+    """
+    Historical rolling-value statistics for one commune and standard window.
+
+    All location parameters must be in canonical format (with spaces preserved).
+
+    Args:
+        province: Province name in canonical format (e.g., "Banteay Meanchey")
+        district: District name in canonical format (e.g., "Mongkol Borei")
+        commune: Commune name in canonical format (e.g., "Banteay Neang")
+        data_type: "precipitation" or "temperature"
+        start_day: Window start, days from Jan 1 (must be a standard window)
+        end_day: Window end, days from Jan 1, inclusive
+        duration: Consecutive days (must be a standard duration)
+        peril_type: Optional "LRI", "ERI", "LTI" or "HTI"; with trigger, adds payout frequency
+        trigger: Optional trigger threshold
+        weather_data_period: Number of most recent years to include (default 30)
+
+    Returns:
+        Dict with per-year minima/maxima, summary statistics and, if requested,
+        the share of years in which the trigger would have been met
+
+    Raises:
+        ValueError: If the window or duration is not precomputed
+        FileNotFoundError: If no climatology table exists for the province
+    """
+    if (start_day, end_day) not in STANDARD_WINDOWS:
+        raise ValueError(f"Window ({start_day}, {end_day}) is not precomputed. Available windows: {STANDARD_WINDOWS}")
+    if duration not in STANDARD_DURATIONS:
+        raise ValueError(f"Duration {duration} is not precomputed. Available durations: {STANDARD_DURATIONS}")
+
+    column = to_climate_column_name(district, commune)
+    by_column = _load_climatology(province_to_filename(province), data_type)
+    if column not in by_column:
+        raise ValueError(f"Commune '{commune}' in district '{district}' (column: '{column}') not found in climatology table.")
+
+    rows = by_column[column]
+    rows = rows[(rows["start_day"] == start_day) & (rows["end_day"] == end_day) & (rows["duration"] == duration)]
+    rows = rows.sort_values("year").tail(weather_data_period)
+
+    min_values = rows["min_value"].to_numpy()
+    max_values = rows["max_value"].to_numpy()
+    preview = {
+        "column": column,
+        "start_day": start_day,
+        "end_day": end_day,
+        "duration": duration,
+        "years": rows["year"].astype(int).tolist(),
+        "min_values": [float(v) for v in min_values],
+        "max_values": [float(v) for v in max_values],
+        "summary": {
+            "years_analyzed": int(len(rows)),
+            "lowest": float(min_values.min()) if len(rows) else None,
+            "highest": float(max_values.max()) if len(rows) else None,
+            "mean_min": float(min_values.mean()) if len(rows) else None,
+            "mean_max": float(max_values.mean()) if len(rows) else None,
+        },
+    }
+
+    if peril_type is not None and trigger is not None:
+        if peril_type in LOW_PERILS:
+            triggered = min_values < trigger
+        else:
+            triggered = max_values > trigger
+        preview["peril_type"] = peril_type
+        preview["trigger"] = float(trigger)
+        preview["payout_years"] = int(triggered.sum())
+        preview["payout_frequency"] = float(triggered.mean()) if len(rows) else 0.0
+
+    return preview
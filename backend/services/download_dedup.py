@@ -0,0 +1,162 @@
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from models.weather_download import WeatherDownloadStatus
+from utils.download_files import DOWNLOADS_BUCKET, download_file_path
+
+# Expiry of the signed URLs stored on completed downloads
+SIGNED_URL_EXPIRY_SECONDS = 86400 * 7
+
+# A download runs as consecutive Celery stages (data_task, retrieval units, assembly),
+# each killed after the worker's task_time_limit
+DOWNLOAD_PIPELINE_STAGES = 3
+
+IN_FLIGHT_STATUSES = [WeatherDownloadStatus.QUEUED.value, WeatherDownloadStatus.RUNNING.value]
+
+
+def find_reusable_download(supabase, request_hash: str) -> Optional[dict]:
+    """
+    Most recent completed download with this request hash whose file still exists.
+
+    The storage object is checked with create_signed_url, which fails once the file has
+    been removed (e.g. by the storage cleanup).
+
+    Returns:
+        The weather_downloads row, or None
+    """
+    result = supabase.table("weather_downloads")\
+        .select("*")\
+        .eq("request_hash", request_hash)\
+        .eq("status", WeatherDownloadStatus.COMPLETED.value)\
+        .not_.is_("file_url", "null")\
+        .order("updated_at", desc=True)\
+        .limit(3)\
+        .execute()
+
+    for download in result.data or []:
+        try:
+            signed = supabase.storage.from_(DOWNLOADS_BUCKET).create_signed_url(download_file_path(download), 60)
+        except Exception:
+            continue
+        if signed.get("signedURL"):
+            return download
+    return None
+
+
+def inflight_max_age_seconds() -> float:
+    """
+    Age after which an in-flight download is assumed dead and is not attached to.
+
+    DEDUP_INFLIGHT_MAX_AGE_HOURS if set, otherwise the longest a download can run:
+    task_time_limit (celeryconfig) for each of its pipeline stages.
+    """
+    if os.getenv("DEDUP_INFLIGHT_MAX_AGE_HOURS"):
+        return float(os.getenv("DEDUP_INFLIGHT_MAX_AGE_HOURS")) * 3600
+    from celery_worker import celery_app
+    return DOWNLOAD_PIPELINE_STAGES * float(celery_app.conf.task_time_limit or 3600)
+
+
+def find_leading_download(supabase, request_hash: str) -> Optional[dict]:
+    """
+    Oldest recent in-flight download with this request hash.
+
+    Called after the new row is inserted: if the leader is another row, the new request
+    attaches to it instead of starting a task. Concurrent identical submissions all see
+    the same leader, so only one of them dispatches. Rows older than
+    inflight_max_age_seconds() are ignored: their task can no longer be running.
+
+    Returns:
+        The leading weather_downloads row, or None
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=inflight_max_age_seconds())
+    result = supabase.table("weather_downloads")\
+        .select("*")\
+        .eq("request_hash", request_hash)\
+        .in_("status", IN_FLIGHT_STATUSES)\
+        .gte("created_at", cutoff.isoformat())\
+        .order("created_at")\
+        .order("id")\
+        .limit(1)\
+        .execute()
+    return result.data[0] if result.data else None
+
+
+def complete_from_existing_file(supabase, download: dict, source_path: str) -> dict:
+    """
+    Complete a download by copying an existing file to its own storage path.
+
+    The copy is server-side, and each row keeps its own object, so cleaning up one
+    download never breaks another.
+
+    Args:
+        download: weather_downloads row to complete
+        source_path: Storage path of the identical file
+
+    Returns:
+        Dict with file_path and file_url (signed URL)
+    """
+    bucket = supabase.storage.from_(DOWNLOADS_BUCKET)
+    file_path = download_file_path({**download, "file_path": None})
+    if file_path != source_path:
+        bucket.copy(source_path, file_path)
+
+    signed_url_response = bucket.create_signed_url(file_path, SIGNED_URL_EXPIRY_SECONDS)
+    if not signed_url_response.get("signedURL"):
+        raise Exception("Failed to generate signed URL")
+
+    supabase.table("weather_downloads")\
+        .update({
+            "status": WeatherDownloadStatus.COMPLETED.value,
+            "file_url": signed_url_response["signedURL"],
+            "file_path": file_path,
+            "updated_at": "now()"
+        })\
+        .eq("id", download["id"])\
+        .execute()
+    return {"file_path": file_path, "file_url": signed_url_response["signedURL"]}
+
+
+def complete_attached_downloads(supabase, leader_id: str, request_hash: Optional[str], source_path: str) -> int:
+    """
+    Complete the in-flight downloads that attached to a finished leader.
+
+    Returns:
+        Number of downloads completed
+    """
+    if not request_hash:
+        return 0
+
+    result = supabase.table("weather_downloads")\
+        .select("*")\
+        .eq("request_hash", request_hash)\
+        .in_("status", IN_FLIGHT_STATUSES)\
+        .neq("id", leader_id)\
+        .execute()
+
+    completed = 0
+    for download in result.data or []:
+        try:
+            complete_from_existing_file(supabase, download, source_path)
+            completed += 1
+        except Exception as e:
+            print(f"[WARNING] Failed to complete attached download {download['id']}: {str(e)}")
+    if completed:
+        print(f"[INFO] Completed {completed} attached download(s) from {source_path}")
+    return completed
+
+
+def fail_attached_downloads(supabase, leader_id: str, request_hash: Optional[str], error_message: str):
+    """Mark the in-flight downloads attached to a failed leader as failed."""
+    if not request_hash:
+        return
+
+    supabase.table("weather_downloads")\
+        .update({
+            "status": WeatherDownloadStatus.FAILED.value,
+            "error_message": error_message,
+            "updated_at": "now()"
+        })\
+        .eq("request_hash", request_hash)\
+        .in_("status", IN_FLIGHT_STATUSES)\
+        .neq("id", leader_id)\
+        .execute()
@@ -0,0 +1,81 @@
+import threading
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+from countries.cambodia import (
+    get_communes_geodataframe,
+    validate_location,
+    to_climate_column_name
+)
+
+# Process-wide spatial index over commune boundaries: (STRtree, [(province, district, commune), ...])
+_commune_tree_cache: Optional[Tuple[Any, List[Tuple[str, str, str]]]] = None
+_commune_tree_lock = threading.Lock()
+
+
+def _get_commune_tree():
+    """
+    Build (once) and return an STRtree over the commune polygons.
+
+    Only polygons whose names are canonical locations (see validate_location) are
+    indexed, so every match can be priced directly. Polygons outside the location
+    data, such as the Tonle Sap lake, are left out.
+    """
+    global _commune_tree_cache
+    if _commune_tree_cache is None:
+        with _commune_tree_lock:
+            if _commune_tree_cache is None:
+                from shapely import STRtree
+
+                communes_gdf = get_communes_geodataframe()
+                geometries = []
+                locations = []
+                for province, district, commune, geometry in zip(
+                    communes_gdf["NAME_1"], communes_gdf["NAME_2"], communes_gdf["NAME_3"], communes_gdf.geometry
+                ):
+                    if geometry is None or not validate_location(province, district, commune):
+                        continue
+                    geometries.append(geometry)
+                    locations.append((province, district, commune))
+                _commune_tree_cache = (STRtree(geometries), locations)
+    return _commune_tree_cache
+
+
+def geocode_points(coordinates: List[Tuple[float, float]]) -> List[Optional[Dict[str, str]]]:
+    """
+    Resolve (longitude, latitude) points to canonical commune locations.
+
+    All points are matched in one vectorized STRtree query. A point on a shared
+    boundary is assigned to the first commune in dataset order.
+
+    Args:
+        coordinates: List of (longitude, latitude) pairs in WGS84
+
+    Returns:
+        List aligned with the input: for each point a dict with province, district,
+        commune (canonical format) and climate_column, or None if the point is not
+        inside any commune
+    """
+    if not coordinates:
+        return []
+
+    import shapely
+
+    tree, locations = _get_commune_tree()
+    points = shapely.points(np.asarray(coordinates, dtype=np.float64))
+    point_idx, commune_idx = tree.query(points, predicate="intersects")
+
+    # Keep the lowest commune index per point (deterministic on shared boundaries)
+    order = np.lexsort((commune_idx, point_idx))
+    point_idx, commune_idx = point_idx[order], commune_idx[order]
+    first_match = np.unique(point_idx, return_index=True)[1]
+
+    results: List[Optional[Dict[str, str]]] = [None] * len(coordinates)
+    for point, commune_pos in zip(point_idx[first_match].tolist(), commune_idx[first_match].tolist()):
+        province, district, commune = locations[commune_pos]
+        results[point] = {
+            "province": province,
+            "district": district,
+            "commune": commune,
+            "climate_column": to_climate_column_name(district, commune),
+        }
+    return results
@@ -345,7 +345,8 @@ def run_optimization(option_type: str, commune: str, province: str, district: st
         "coverage_score": round(result.get("coverage_score", 0), 4),
         "payout_stability_score": round(result.get("payout_stability_score", 0), 4),
         "coverage_penalty": round(result.get("coverage_penalty", 0), 4),
-        "periods_with_no_payouts": result.get("periods_with_no_payouts", 0)
+        "periods_with_no_payouts": result.get("periods_with_no_payouts", 0),
+        "dataVersion": result.get("data_version")
     }
     
     # Add premium increase info for Premium Choice
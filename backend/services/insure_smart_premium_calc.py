@@ -1,4 +1,3 @@
-import os
 import pandas as pd
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
@@ -8,6 +7,7 @@ from countries.cambodia import (
     validate_location,
     from_climate_column_name
 )
+from services.climate_store import load_climate_data_with_version, clear_climate_data_cache
 
 # Helper: Map index type
 INDEX_TYPE_MAP = {
@@ -22,12 +22,9 @@ INDEX_TYPE_MAP = {
 DEFAULT_ADMIN_LOADING = 0.15  # 15% admin cost loading
 DEFAULT_PROFIT_LOADING = 0.15  # 7.5% profit loading
 
-# Module-level cache for weather data
-_weather_data_cache = {}
-
 def clear_weather_data_cache():
     """Clear the in-memory weather data cache."""
-    _weather_data_cache.clear()
+    clear_climate_data_cache()
 
 def _get_weather_data(province, data_type):
     # Validate province exists in canonical location data (e.g., "Banteay Meanchey")
@@ -43,28 +40,9 @@ def _get_weather_data(province, data_type):
     # Convert canonical province name to filename format
     normalized_province = province_to_filename(province)
     
-    key = (normalized_province, data_type)
-    if key in _weather_data_cache:
-        return _weather_data_cache[key]
-    print(f"Loading weather data from disk for {province} (normalized: {normalized_province}), {data_type}")
-    
-    # Try Parquet first (new format)
-    parquet_path = os.path.join(os.getcwd(), "climate_data", data_type, "Cambodia", f"{normalized_province}.parquet")
-    if os.path.exists(parquet_path):
-        print(f"Loading Parquet file: {parquet_path}")
-        df = pd.read_parquet(parquet_path)
-        _weather_data_cache[key] = df
-        return df
-    
-    # Fallback to Excel (old format)
-    excel_path = os.path.join(os.getcwd(), "files", data_type, "Cambodia", f"{normalized_province}.xlsx")
-    if os.path.exists(excel_path):
-        print(f"Loading Excel file (fallback): {excel_path}")
-        df = pd.read_excel(excel_path, parse_dates=['Date'])
-        _weather_data_cache[key] = df
-        return df
-    
-    raise FileNotFoundError(f"No weather data file found for {province} (normalized: {normalized_province}). Tried: {parquet_path} and {excel_path}")
+    # Parquet store first, Excel fallback; cached per (province, data_type)
+    # Returns (DataFrame, data_version) so results can report which data was used
+    return load_climate_data_with_version(normalized_province, data_type)
 
 # Main function
 
@@ -140,7 +118,7 @@ def calculate_insure_smart_premium(
     
     # 1. Load weather data
     # Province name normalization is handled in _get_weather_data()
-    df = _get_weather_data(province, data_type)
+    df, data_version = _get_weather_data(province, data_type)
     
     # Convert district and commune to climate data column format
     commune_column = to_climate_column_name(district, commune)
@@ -316,5 +294,6 @@ def calculate_insure_smart_premium(
         "loaded_premium": loaded_premium,
         "loss_ratio": loss_ratio,
         "coverage_penalty": coverage_penalty,
-        "periods_with_no_payouts": periods_with_no_payouts
+        "periods_with_no_payouts": periods_with_no_payouts,
+        "data_version": data_version
     } 
\ No newline at end of file
@@ -5,6 +5,7 @@ import logging
 from typing import Dict, List
 from datetime import datetime, timedelta
 from schemas.premium_schema import PremiumRequest
+from services.rolling_windows import window_sums
 from fastapi import HTTPException
 
 logging.basicConfig(level=logging.INFO)
@@ -39,24 +40,20 @@ def analyze_phase_data(
     if len(phase_data) < consecutive_days:
         return False, 0.0
 
-    # Calculate rolling sums
-    cumulative_values = (
-        phase_data.rolling(window=consecutive_days, min_periods=consecutive_days)
-        .sum()
-        .dropna()
-        .tolist()
-    )
+    # Calculate rolling sums (shared sliding-window kernel); windows with missing days
+    # are dropped, as with rolling(min_periods=consecutive_days)
+    cumulative_values = window_sums(phase_data.to_numpy(), consecutive_days, drop_incomplete=True)
 
-    if not cumulative_values:
+    if not len(cumulative_values):
         return False, 0.0
 
     # Determine critical value based on index type
     mapped_type = map_index_type(index_type)
     if mapped_type == "LRI":
-        critical_value = min(cumulative_values)  # Minimum cumulative rainfall
+        critical_value = cumulative_values.min()  # Minimum cumulative rainfall
         trigger_met = critical_value < trigger
     else:  # ERI
-        critical_value = max(cumulative_values)  # Maximum cumulative rainfall
+        critical_value = cumulative_values.max()  # Maximum cumulative rainfall
         trigger_met = critical_value > trigger
 
     return trigger_met, float(critical_value)
@@ -1,9 +1,10 @@
-import os
 import pandas as pd
 import logging
 from typing import Dict, List
 from datetime import datetime, timedelta, date
 from schemas.premium_schema import PremiumRequest
+from services.climate_store import load_climate_data_with_version, resolve_commune_column
+from services.rolling_windows import phase_window_extremes
 from fastapi import HTTPException
 
 logging.basicConfig(level=logging.INFO)
@@ -34,37 +35,48 @@ def analyze_phase_data(
     trigger: float
 ) -> tuple[bool, float]:
     """Analyze rainfall data for a specific phase period"""
-    
-    # Get data for the phase period
-    phase_data = df[
-        (df['Date'] >= start_date) & 
-        (df['Date'] <= end_date)
-    ].copy()
-    
-    if len(phase_data) < consecutive_days:
-        return False, 0.0
-    
-    # Calculate cumulative rainfall for each consecutive period
-    cumulative_values = []
-    for i in range(len(phase_data) - consecutive_days + 1):
-        period = phase_data.iloc[i:i + consecutive_days]
-        period_sum = float(period[commune].sum())
-        cumulative_values.append(period_sum)
-    
-    if not cumulative_values:
-        return False, 0.0
+    trigger_met, critical_values = analyze_phase_years(
+        df, commune, [start_date], [end_date], consecutive_days, index_type, trigger
+    )
+    return trigger_met[0], critical_values[0]
+
+def analyze_phase_years(
+    df: pd.DataFrame,
+    commune: str,
+    start_dates: List[datetime],
+    end_dates: List[datetime],
+    consecutive_days: int,
+    index_type: str,
+    trigger: float
+) -> tuple[List[bool], List[float]]:
+    """Analyze rainfall data for the same phase across all historical years in one pass"""
     
     # For LRI (Drought), find minimum cumulative rainfall
     # For ERI (Excess Rainfall), find maximum cumulative rainfall
     mapped_type = map_index_type(index_type)
-    if mapped_type == "LRI":
-        critical_value = float(min(cumulative_values))
-        trigger_met = bool(critical_value < trigger)
-    else:  # ERI
-        critical_value = float(max(cumulative_values))
-        trigger_met = bool(critical_value > trigger)
+    critical_values, valid = phase_window_extremes(
+        df['Date'].to_numpy(),
+        df[commune].to_numpy(),
+        start_dates,
+        end_dates,
+        consecutive_days,
+        "min" if mapped_type == "LRI" else "max"
+    )
     
-    return trigger_met, critical_value
+    trigger_met = []
+    values = []
+    for critical_value, has_windows in zip(critical_values.tolist(), valid.tolist()):
+        if not has_windows:
+            trigger_met.append(False)
+            values.append(0.0)
+        elif mapped_type == "LRI":
+            trigger_met.append(bool(critical_value < trigger))
+            values.append(float(critical_value))
+        else:  # ERI
+            trigger_met.append(bool(critical_value > trigger))
+            values.append(float(critical_value))
+    
+    return trigger_met, values
 
 def calculate_payout(
     critical_value: float,
@@ -160,11 +172,11 @@ def calculate_premium(request: PremiumRequest) -> Dict:
             raise ValueError("Province is required for weather data lookup.")
         province = province.replace(" ", "")
         data_type = data_type.lower()
-        # Build file path
-        file_path = os.path.join(os.getcwd(), "files", data_type, "Cambodia", f"{province}.xlsx")
-        if not os.path.exists(file_path):
+        # Load from the cached Parquet store (Excel is only used as a fallback)
+        try:
+            df, data_version = load_climate_data_with_version(province, data_type)
+        except FileNotFoundError:
             raise ValueError(f"Weather data file not found for province '{province}' and data type '{data_type}'.")
-        df = pd.read_excel(file_path, parse_dates=['Date'])
         
         # Convert planting date
         if isinstance(request.plantingDate, str):
@@ -172,8 +184,9 @@ def calculate_premium(request: PremiumRequest) -> Dict:
         else:
             planting_date = datetime.combine(request.plantingDate, datetime.min.time())
         
-        # Verify commune exists in data
-        if request.commune not in df.columns:
+        # Verify commune exists in data (Parquet columns are "District_Commune")
+        commune_column = resolve_commune_column(df.columns, request.commune)
+        if commune_column is None:
             raise ValueError(f"Commune '{request.commune}' not found in data. Available communes: {df.columns.tolist()}")
         
         # Calculate year range based on weather data period
@@ -188,28 +201,35 @@ def calculate_premium(request: PremiumRequest) -> Dict:
         logger.info(f"\nAnalyzing rainfall data from {start_year} to {end_year}")
         
         total_payouts = []
+        years = list(range(start_year, end_year + 1))
+        
+        # Evaluate every phase+index across all historical years in one pass
+        phase_outcomes = []
+        for idx in request.indexes:
+            # Get date range for this phase in each historical year
+            aligned = [
+                get_aligned_dates(planting_date, year, idx.phaseStartDate, idx.phaseEndDate)
+                for year in years
+            ]
+            phase_outcomes.append(analyze_phase_years(
+                df,
+                commune_column,
+                [phase_start for phase_start, _ in aligned],
+                [phase_end for _, phase_end in aligned],
+                idx.consecutiveDays,
+                idx.type,
+                idx.trigger
+            ))
         
         # Analyze each historical year
-        for year in range(start_year, end_year + 1):
+        for year_pos, year in enumerate(years):
             year_results = {"year": year, "triggers": [], "total_payout": 0.0}
             year_payout = 0.0  # Track total payout for this year
             
             # Process each combined phase+index
-            for idx in request.indexes:
-                # Get date range for this phase in the historical year
-                phase_start, phase_end = get_aligned_dates(
-                    planting_date, year, idx.phaseStartDate, idx.phaseEndDate
-                )
-                
-                trigger_met, critical_value = analyze_phase_data(
-                    df,
-                    request.commune,
-                    phase_start,
-                    phase_end,
-                    idx.consecutiveDays,
-                    idx.type,
-                    idx.trigger
-                )
+            for idx, (phase_triggers, phase_values) in zip(request.indexes, phase_outcomes):
+                trigger_met = phase_triggers[year_pos]
+                critical_value = phase_values[year_pos]
                 
                 # Calculate payout if trigger is met
                 payout = calculate_payout(
@@ -276,6 +296,7 @@ def calculate_premium(request: PremiumRequest) -> Dict:
         
         return {
             "status": "success",
+            "data_version": data_version,
             "premium": {
                 "rate": float(premium_calculation['premium_percentage']),
                 "etotal": float(premium_calculation['etotal_percentage']),
@@ -0,0 +1,114 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Tuple
+from datetime import datetime
+
+
+def window_sums(values: np.ndarray, window: int, drop_incomplete: bool = False) -> np.ndarray:
+    """
+    Sum of every run of `window` consecutive values in a 1D series.
+
+    By default missing values count as 0, matching pandas' Series.sum(). With
+    drop_incomplete, windows containing a missing value are left out, matching
+    Series.rolling(window, min_periods=window).sum().dropna(). Each window is summed
+    with numpy's reduction over a strided view, so results are bit-identical to
+    summing the same slice with pandas.
+
+    Args:
+        values: 1D array of daily values
+        window: Number of consecutive days per window
+        drop_incomplete: Drop windows that contain NaN instead of counting NaN as 0
+
+    Returns:
+        Array of len(values) - window + 1 sums, fewer with drop_incomplete (empty if
+        the series is shorter than the window)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if window <= 0 or len(values) < window:
+        return np.empty(0, dtype=np.float64)
+    missing = np.isnan(values)
+    filled = np.where(missing, 0.0, values)
+    sums = sliding_window_view(filled, window).sum(axis=1)
+    if drop_incomplete:
+        sums = sums[sliding_window_view(missing, window).sum(axis=1) == 0]
+    return sums
+
+
+def phase_row_bounds(dates: np.ndarray, starts: List[datetime], ends: List[datetime]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row bounds [lo, hi) of each inclusive date range in a sorted date array.
+
+    Args:
+        dates: Sorted datetime64 array
+        starts: Start date of each phase (inclusive)
+        ends: End date of each phase (inclusive)
+
+    Returns:
+        Tuple of (lo, hi) integer arrays, one entry per phase
+    """
+    starts = np.array(starts, dtype="datetime64[ns]")
+    ends = np.array(ends, dtype="datetime64[ns]")
+    lo = np.searchsorted(dates, starts, side="left")
+    hi = np.searchsorted(dates, ends, side="right")
+    return lo, hi
+
+
+def phase_window_extremes(
+    dates: np.ndarray,
+    values: np.ndarray,
+    starts: List[datetime],
+    ends: List[datetime],
+    window: int,
+    reducer: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum or maximum `window`-day sum inside each phase, for all phases at once.
+
+    Window sums are computed once over the whole series; the windows that fit inside
+    each phase are then gathered into a (phases x windows) array and reduced along
+    the window axis. When the dates are not sorted, phases are selected with a date
+    mask instead, which keeps row order identical to boolean indexing.
+
+    Args:
+        dates: datetime64 array of the series dates
+        values: 1D array of daily values aligned with `dates`
+        starts: Start date of each phase (inclusive)
+        ends: End date of each phase (inclusive)
+        window: Number of consecutive days per window
+        reducer: "min" or "max"
+
+    Returns:
+        Tuple of (critical_values, valid). valid is False for phases with fewer rows
+        than `window`; their critical value is 0.0.
+    """
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    values = np.asarray(values, dtype=np.float64)
+    reduce_fn = np.min if reducer == "min" else np.max
+    n_phases = len(starts)
+    critical = np.zeros(n_phases, dtype=np.float64)
+
+    if len(dates) > 1 and not (dates[1:] >= dates[:-1]).all():
+        # Unsorted dates: select each phase with a mask and slide within it
+        valid = np.zeros(n_phases, dtype=bool)
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            mask = (dates >= np.datetime64(start, "ns")) & (dates <= np.datetime64(end, "ns"))
+            sums = window_sums(values[mask], window)
+            if len(sums):
+                critical[i] = reduce_fn(sums)
+                valid[i] = True
+        return critical, valid
+
+    lo, hi = phase_row_bounds(dates, starts, ends)
+    n_windows = hi - lo - window + 1
+    valid = n_windows >= 1
+    if not valid.any():
+        return critical, valid
+
+    sums = window_sums(values, window)
+    offsets = np.arange(n_windows[valid].max())
+    positions = lo[valid][:, None] + offsets
+    in_phase = offsets < n_windows[valid][:, None]
+    gathered = sums[np.where(in_phase, positions, 0)]
+    fill = np.inf if reducer == "min" else -np.inf
+    critical[valid] = reduce_fn(np.where(in_phase, gathered, fill), axis=1)
+    return critical, valid
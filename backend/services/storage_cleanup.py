@@ -0,0 +1,95 @@
+import os
+import time
+from datetime import datetime, timedelta
+from utils.download_files import DOWNLOADS_BUCKET, download_file_path
+from utils.supabase_client import bulk_update, get_supabase_client
+
+# Downloads older than this lose their file
+CLEANUP_MAX_AGE_HOURS = float(os.getenv("CLEANUP_MAX_AGE_HOURS", "24"))
+
+# Expired rows fetched per page
+CLEANUP_PAGE_SIZE = int(os.getenv("CLEANUP_PAGE_SIZE", "500"))
+
+# Storage objects deleted per remove() call
+STORAGE_REMOVE_BATCH_SIZE = int(os.getenv("STORAGE_REMOVE_BATCH_SIZE", "100"))
+
+
+def cleanup_expired_downloads(
+    max_age_hours: float = CLEANUP_MAX_AGE_HOURS,
+    page_size: int = CLEANUP_PAGE_SIZE,
+    remove_batch_size: int = STORAGE_REMOVE_BATCH_SIZE
+) -> dict:
+    """
+    Delete the storage files of expired weather downloads and clear their file_url.
+
+    Expired rows are processed a page at a time. For each page, the files are deleted
+    with batched remove() calls, then file_url is nulled with one bulk update. The
+    database records are kept. Because each page clears its own rows, the next query
+    returns the next page without an offset.
+
+    Args:
+        max_age_hours: Age (by created_at) after which a download expires
+        page_size: Rows per page
+        remove_batch_size: Paths per storage remove() call
+
+    Returns:
+        dict: Metrics (rows, files removed / missing / failed, pages, seconds)
+    """
+    supabase = get_supabase_client()
+    bucket = supabase.storage.from_(DOWNLOADS_BUCKET)
+    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+    start_time = time.time()
+
+    metrics = {
+        "pages": 0,
+        "rows_cleared": 0,
+        "files_deleted": 0,
+        "files_missing": 0,
+        "files_failed": 0,
+        "storage_seconds": 0.0,
+        "database_seconds": 0.0,
+    }
+
+    while True:
+        query_start = time.time()
+        result = supabase.table("weather_downloads")\
+            .select("id, requested_by_user_id, dataset, provinces, date_start, date_end, output_format, file_path")\
+            .not_.is_("file_url", "null")\
+            .lt("created_at", cutoff.isoformat())\
+            .order("created_at")\
+            .limit(page_size)\
+            .execute()
+        metrics["database_seconds"] += time.time() - query_start
+
+        page = result.data or []
+        if not page:
+            break
+        metrics["pages"] += 1
+
+        paths = list(dict.fromkeys(download_file_path(download) for download in page))
+        storage_start = time.time()
+        for batch_start in range(0, len(paths), remove_batch_size):
+            batch = paths[batch_start:batch_start + remove_batch_size]
+            try:
+                # Supabase returns the objects it deleted; paths already gone are simply absent
+                removed = bucket.remove(batch) or []
+                metrics["files_deleted"] += len(removed)
+                metrics["files_missing"] += len(batch) - len(removed)
+            except Exception as e:
+                metrics["files_failed"] += len(batch)
+                print(f"[WARNING] Failed to delete {len(batch)} storage files: {str(e)}")
+        metrics["storage_seconds"] += time.time() - storage_start
+
+        # The records no longer point to a file, even where deletion failed (as before)
+        update_start = time.time()
+        metrics["rows_cleared"] += bulk_update("weather_downloads", [download["id"] for download in page], {"file_url": None})
+        metrics["database_seconds"] += time.time() - update_start
+
+        if len(page) < page_size:
+            break
+
+    metrics["storage_seconds"] = round(metrics["storage_seconds"], 3)
+    metrics["database_seconds"] = round(metrics["database_seconds"], 3)
+    metrics["total_seconds"] = round(time.time() - start_time, 3)
+    print(f"[INFO] Storage cleanup finished: {metrics}")
+    return metrics
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Tests import backend modules the way the app does (backend/ on sys.path) and read
+# data files relative to the backend directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
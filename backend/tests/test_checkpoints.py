@@ -0,0 +1,76 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from utils.checkpoints import checkpointed_retrieval, load_checkpoint, load_unit_result, save_unit_result
+
+GDF = pd.DataFrame({"NAME_2": ["District"], "NAME_3": ["Commune"]})
+
+
+def _frame(start, end):
+    dates = pd.date_range(start, end, inclusive="left").strftime("%Y-%m-%d")
+    return pd.DataFrame({"Date": dates, "District_Commune": 1.0})
+
+
+def test_missing_chunks_are_fetched_in_parallel_and_resumed(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+    calls = []
+    running, peak = [0], [0]
+    lock = threading.Lock()
+    all_started = threading.Barrier(4, timeout=5)
+
+    def retrieve(gdf, start, end):
+        with lock:
+            calls.append(start)
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        # Only returns once all four chunks are in flight at the same time
+        all_started.wait()
+        with lock:
+            running[0] -= 1
+        return _frame(start, end)
+
+    run = checkpointed_retrieval(retrieve, "download-1", "precipitation|Kep", days_per_unit=10, max_parallel_units=4)
+    result = run(GDF, "2020-01-01", "2020-02-10")
+
+    assert peak[0] == 4
+    assert sorted(calls) == ["2020-01-01", "2020-01-11", "2020-01-21", "2020-01-31"]
+    assert result["Date"].tolist() == _frame("2020-01-01", "2020-02-10")["Date"].tolist()
+
+    # A redelivered task loads every chunk from its checkpoint
+    calls.clear()
+    resumed = checkpointed_retrieval(retrieve, "download-1", "precipitation|Kep", days_per_unit=10)(GDF, "2020-01-01", "2020-02-10")
+    assert calls == []
+    pd.testing.assert_frame_equal(resumed, result)
+
+
+def test_chunks_that_succeeded_are_saved_when_another_fails(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+
+    def retrieve(gdf, start, end):
+        if start == "2020-01-11":
+            raise RuntimeError("Earth Engine error")
+        return _frame(start, end)
+
+    run = checkpointed_retrieval(retrieve, "download-2", "precipitation|Kep", days_per_unit=10, max_parallel_units=2)
+    with pytest.raises(RuntimeError):
+        run(GDF, "2020-01-01", "2020-01-21")
+
+    assert load_checkpoint("download-2", "precipitation|Kep|District/Commune|2020-01-01|2020-01-11") is not None
+    assert load_checkpoint("download-2", "precipitation|Kep|District/Commune|2020-01-11|2020-01-21") is None
+
+
+def test_unit_results_go_by_path_only_with_a_shared_checkpoint_dir(tmp_path, monkeypatch):
+    frame = _frame("2020-01-01", "2020-01-05")
+
+    # No shared folder: the assembly may run on another host, so the frame travels inline
+    monkeypatch.delenv("CHECKPOINT_DIR", raising=False)
+    inline = save_unit_result("download-3", "precipitation|Kep", frame)
+    assert "path" not in inline
+    pd.testing.assert_frame_equal(load_unit_result(inline), frame)
+
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+    stored = save_unit_result("download-3", "precipitation|Kep", frame)
+    assert stored["path"].startswith(str(tmp_path))
+    pd.testing.assert_frame_equal(load_unit_result(stored), frame)
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from utils.download_files import join_unit_frames, write_download_file
+
+
+def _unit(province, columns, dates, offset):
+    frame = pd.DataFrame({"Date": dates})
+    for i, column in enumerate(columns):
+        frame[column] = float(offset + i)
+    return province, frame
+
+
+def test_join_unit_frames_prefixes_communes_shared_by_provinces(tmp_path):
+    dates = ["2020-01-01", "2020-01-02"]
+    # "TonléSap_TonléSap" exists in Battambang, Pursat and others; the Pursat unit is
+    # split into two district chunks
+    units = [
+        _unit("Battambang", ["TonléSap_TonléSap", "Banan_KantueuMuoy"], dates, 0),
+        _unit("Pursat", ["Bakan_Boeng"], dates, 10),
+        _unit("Pursat", ["TonléSap_TonléSap"], dates, 20),
+    ]
+
+    joined = join_unit_frames(units)
+
+    assert list(joined.columns) == [
+        "Date", "Battambang_TonléSap_TonléSap", "Banan_KantueuMuoy", "Bakan_Boeng", "Pursat_TonléSap_TonléSap"
+    ]
+    assert joined["Battambang_TonléSap_TonléSap"].tolist() == [0.0, 0.0]
+    assert joined["Pursat_TonléSap_TonléSap"].tolist() == [20.0, 20.0]
+
+    # Columnar writers reject duplicate column names
+    for output_format in ("parquet", "arrow"):
+        path = tmp_path / f"download.{output_format}"
+        write_download_file(joined, str(path), output_format)
+        assert path.stat().st_size > 0
+
+
+def test_join_unit_frames_keeps_names_of_a_single_province():
+    dates = ["2020-01-01"]
+    joined = join_unit_frames([_unit("Pursat", ["TonléSap_TonléSap"], dates, 0)])
+    assert list(joined.columns) == ["Date", "TonléSap_TonléSap"]
+    assert list(join_unit_frames([]).columns) == ["Date"]
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from weather.gee_executor import GeeRequestExecutor, TokenBucket
+
+
+class FakeClock:
+    """Virtual time: sleep() advances the clock instead of blocking."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+
+def flaky(failures, result, error=Exception("429 Too Many Requests")):
+    """Request that raises `error` for its first `failures` calls, then returns result."""
+    calls = []
+
+    def request():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error
+        return result
+
+    request.calls = calls
+    return request
+
+
+def test_retries_retryable_errors_with_capped_exponential_backoff():
+    clock = FakeClock()
+    executor = GeeRequestExecutor(
+        max_concurrency=1, requests_per_second=1000, max_retries=5,
+        base_delay=1.0, max_delay=5.0, clock=clock, sleep=clock.sleep, jitter=lambda: 1.0
+    )
+    request = flaky(4, "ok")
+
+    assert executor.call(request) == "ok"
+    assert len(request.calls) == 5
+    # Full jitter fixed at 1.0: delays are the exponential caps 1, 2, 4, then max_delay
+    assert clock.sleeps == [1.0, 2.0, 4.0, 5.0]
+
+
+def test_gives_up_after_max_retries_and_on_permanent_errors():
+    clock = FakeClock()
+    executor = GeeRequestExecutor(
+        max_concurrency=1, requests_per_second=1000, max_retries=2,
+        clock=clock, sleep=clock.sleep, jitter=lambda: 0.0
+    )
+    request = flaky(10, "ok")
+    with pytest.raises(Exception, match="429"):
+        executor.call(request)
+    assert len(request.calls) == 3
+
+    request = flaky(1, "ok", error=ValueError("Image.select: band not found"))
+    with pytest.raises(ValueError):
+        executor.call(request)
+    assert len(request.calls) == 1
+
+
+def test_token_bucket_paces_requests_after_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=3, clock=clock, sleep=clock.sleep)
+    acquired_at = []
+    for _ in range(7):
+        bucket.acquire()
+        acquired_at.append(clock.now)
+
+    # The burst goes through at once, then one token every 1 / rate seconds
+    assert acquired_at == pytest.approx([0.0, 0.0, 0.0, 0.5, 1.0, 1.5, 2.0])
+
+
+def test_map_returns_results_in_input_order_with_concurrent_retries():
+    executor = GeeRequestExecutor(
+        max_concurrency=4, requests_per_second=1000, burst=1000, max_retries=3,
+        base_delay=0.001, jitter=lambda: 1.0
+    )
+
+    def request(i):
+        attempts = []
+
+        def run():
+            attempts.append(1)
+            # Later requests finish first; every third fails once before succeeding
+            time.sleep(0.002 * (10 - i))
+            if i % 3 == 0 and len(attempts) == 1:
+                raise TimeoutError("deadline exceeded")
+            return i * i
+        return run
+
+    assert executor.map([request(i) for i in range(10)]) == [i * i for i in range(10)]
@@ -0,0 +1,59 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import services.premium_calculator as premium_calculator
+from schemas.premium_schema import PremiumRequest
+from services.climate_store import get_excel_path, resolve_commune_column
+
+
+def _request(commune: str, province: str = "Kep") -> PremiumRequest:
+    return PremiumRequest(
+        productName="Regression",
+        commune=commune,
+        cropType="Rice",
+        growingDuration=120,
+        weatherDataPeriod=10,
+        plantingDate=date(2024, 6, 1),
+        indexes=[{
+            "phaseName": "Vegetative",
+            "phaseStartDate": date(2024, 6, 1),
+            "phaseEndDate": date(2024, 7, 1),
+            "type": "Drought",
+            "trigger": 50,
+            "exit": 0,
+            "dailyCap": 10,
+            "unitPayout": 1,
+            "maxPayout": 100,
+            "consecutiveDays": 10,
+        }],
+        coverageType="Weather",
+        province=province,
+        dataType="precipitation",
+    )
+
+
+def test_resolve_commune_column():
+    columns = ["Date", "DamnakChang'aeur_Angkaol", "Kaeb_PreyThum", "A_Samraong", "B_Samraong"]
+    assert resolve_commune_column(columns, "Angkaol") == "DamnakChang'aeur_Angkaol"
+    assert resolve_commune_column(columns, "Prey Thum") == "Kaeb_PreyThum"
+    assert resolve_commune_column(columns, "Kaeb_PreyThum") == "Kaeb_PreyThum"
+    # Repeated commune names resolve to the first column, like the Excel files did
+    assert resolve_commune_column(columns, "Samraong") == "A_Samraong"
+    assert resolve_commune_column(columns, "Nowhere") is None
+    assert resolve_commune_column(["Date", "Angkaol"], "Angkaol") == "Angkaol"
+
+
+def test_frontend_commune_name_matches_legacy_excel_result(monkeypatch):
+    # Frontend commune names are plain ("Angkaol"); the Parquet store is "District_Commune"
+    parquet_result = premium_calculator.calculate_premium(_request("Angkaol"))
+    assert parquet_result["status"] == "success"
+
+    # Baseline behaviour: the same request priced from the legacy Excel file
+    excel_df = pd.read_excel(get_excel_path("Kep", "precipitation"), parse_dates=["Date"])
+    monkeypatch.setattr(premium_calculator, "load_climate_data_with_version", lambda *args: (excel_df, "excel"))
+    excel_result = premium_calculator.calculate_premium(_request("Angkaol"))
+
+    assert parquet_result["premium"]["rate"] == pytest.approx(excel_result["premium"]["rate"], rel=1e-6)
+    assert parquet_result["risk_metrics"] == pytest.approx(excel_result["risk_metrics"], rel=1e-6)
@@ -0,0 +1,75 @@
+import time
+
+from utils import progress
+from utils.progress import ProgressReporter
+
+
+class FakeRedis:
+    """Just enough of redis-py for the progress counters (hashes, SET NX PX)."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.expiring = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def set(self, key, value, nx=False, px=None):
+        now = time.monotonic()
+        if nx and self.expiring.get(key, 0) > now:
+            return None
+        self.expiring[key] = now + px / 1000
+        return True
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.results = []
+
+    def hincrbyfloat(self, key, field, amount):
+        fields = self.client.hashes.setdefault(key, {})
+        fields[field] = fields.get(field, 0.0) + amount
+        self.results.append(fields[field])
+
+    def hgetall(self, key):
+        self.results.append({k.encode(): str(v).encode() for k, v in self.client.hashes.get(key, {}).items()})
+
+    def execute(self):
+        return self.results
+
+
+class FakeTask:
+    def __init__(self, fail=False):
+        self.states = []
+        self.fail = fail
+
+    def update_state(self, state, meta):
+        if self.fail:
+            raise ConnectionError("result backend unavailable")
+        self.states.append(meta)
+
+    def send_event(self, event_type, **fields):
+        pass
+
+
+def test_parallel_units_share_one_publish_interval(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(progress, "_get_redis", lambda: fake)
+    task = FakeTask()
+    units = [ProgressReporter("download-1", 10, 100, task=task, min_interval=60) for _ in range(4)]
+
+    for _ in range(5):
+        for unit in units:
+            unit.batch_done(1, 10, 0.5)
+
+    # 20 batches over 4 units within one interval: a single publish for the download
+    assert len(task.states) == 1
+
+
+def test_task_state_failures_do_not_fail_the_unit(monkeypatch):
+    monkeypatch.setattr(progress, "_get_redis", lambda: FakeRedis())
+    unit = ProgressReporter("download-2", 10, 100, task=FakeTask(fail=True), min_interval=0)
+    unit.start()
+    unit.batch_done(10, 100, 1.0)
+    unit.unit_done()
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from services.premium_calc import analyze_phase_data
+from services.rolling_windows import window_sums
+
+
+def test_window_sums_match_pandas():
+    values = pd.Series([1.0, 2.0, np.nan, 4.0, 5.0, 6.0, 7.0])
+    # Default: NaN counts as 0, like Series.sum() of each slice
+    expected = [values.iloc[i:i + 3].sum() for i in range(len(values) - 2)]
+    assert window_sums(values.to_numpy(), 3).tolist() == expected
+    # drop_incomplete: like rolling(min_periods=window).sum().dropna()
+    expected = values.rolling(3, min_periods=3).sum().dropna().tolist()
+    assert window_sums(values.to_numpy(), 3, drop_incomplete=True).tolist() == expected
+
+
+def test_phase_analysis_ignores_windows_with_gaps():
+    # The only low window contains a missing day; it must not trigger a drought payout
+    phase = pd.Series([20.0, 20.0, np.nan, 20.0, 20.0, 20.0])
+    trigger_met, critical = analyze_phase_data(phase, 3, "Drought", 50.0)
+    assert not trigger_met
+    assert critical == 60.0
+
+    # All windows incomplete: no critical value, as before
+    assert analyze_phase_data(pd.Series([np.nan] * 4), 3, "Drought", 50.0) == (False, 0.0)
@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+
+from services.climate_store import get_parquet_path
+from services import climatology
+from services.climatology import get_climatology_path
+from weather import store_planner
+from weather.store_planner import write_back_to_store
+
+
+def _write_commune(store_dir, column, repeats):
+    os.chdir(store_dir)
+    dates = pd.date_range("2000-01-01", "2000-12-31")
+    for i in range(repeats):
+        fetched = pd.DataFrame({"Date": dates[i::repeats], column: 1.0})
+        write_back_to_store("Testprovince", "precipitation", fetched)
+
+
+def test_concurrent_write_backs_keep_every_fill(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = get_parquet_path("Testprovince", "precipitation")
+    os.makedirs(os.path.dirname(path))
+    dates = pd.date_range("2000-01-01", "2000-12-31")
+    store = pd.DataFrame({"Date": dates, "District_Stored": np.arange(len(dates), dtype=float)})
+    # Each worker fills the gaps of its own commune, a few days per write-back
+    for n in range(3):
+        store[f"District_Fetched{n}"] = np.nan
+    store.to_parquet(path, index=False)
+
+    rebuilds = []
+    monkeypatch.setattr(store_planner, "schedule_climatology_rebuild", lambda *key: rebuilds.append(key))
+
+    # A climatology table built from the old store file
+    climatology_path = get_climatology_path("Testprovince", "precipitation")
+    os.makedirs(os.path.dirname(climatology_path))
+    pd.DataFrame({"column": ["District_Stored"]}).to_parquet(climatology_path, index=False)
+    stamp = os.stat(path).st_mtime_ns
+    os.utime(climatology_path, ns=(stamp, stamp))
+
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_write_commune, args=(str(tmp_path), f"District_Fetched{n}", 8))
+        for n in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    store = pd.read_parquet(path)
+    assert set(store.columns) == {"Date", "District_Stored", "District_Fetched0", "District_Fetched1", "District_Fetched2"}
+    for n in range(3):
+        assert store[f"District_Fetched{n}"].notna().all()
+    assert store["District_Stored"].tolist() == list(np.arange(len(dates), dtype=float))
+    # The old table stays in place (served until rebuilt) but is outdated
+    assert os.path.exists(climatology_path)
+    assert climatology._climatology_outdated("Testprovince", "precipitation")
+
+
+def test_new_commune_is_only_added_with_its_whole_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(store_planner, "schedule_climatology_rebuild", lambda *key: None)
+    path = get_parquet_path("Testprovince", "precipitation")
+    os.makedirs(os.path.dirname(path))
+    dates = pd.date_range("2000-01-01", "2002-12-31")
+    pd.DataFrame({"Date": dates, "District_Stored": 1.0}).to_parquet(path, index=False)
+
+    # A download of one month must not add a commune that is NaN for the other years
+    month = pd.date_range("2001-06-01", "2001-06-30")
+    assert not write_back_to_store("Testprovince", "precipitation", pd.DataFrame({"Date": month, "District_New": 5.0}))
+    assert list(pd.read_parquet(path).columns) == ["Date", "District_Stored"]
+
+    # Fetched over the file's whole span, the commune is added
+    assert write_back_to_store("Testprovince", "precipitation", pd.DataFrame({"Date": dates, "District_New": 5.0}))
+    store = pd.read_parquet(path)
+    assert list(store.columns) == ["Date", "District_Stored", "District_New"]
+    assert store["District_New"].notna().all()
+
+
+def test_write_back_schedules_one_rebuild_and_previews_serve_the_old_table(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = get_parquet_path("Testprovince", "precipitation")
+    os.makedirs(os.path.dirname(path))
+    dates = pd.date_range("2000-01-01", "2001-12-31")
+    pd.DataFrame({"Date": dates, "District_Stored": 1.0, "District_Gap": np.nan}).to_parquet(path, index=False)
+    climatology.build_province_climatology("Testprovince", "precipitation")
+    old_table = climatology._load_climatology("Testprovince", "precipitation")
+
+    rebuilds = []
+    monkeypatch.setattr(store_planner, "schedule_climatology_rebuild", lambda *key: rebuilds.append(key))
+    assert write_back_to_store("Testprovince", "precipitation", pd.DataFrame({"Date": dates, "District_Gap": 2.0}))
+    assert rebuilds == [("Testprovince", "precipitation")]
+
+    # Until the rebuild has run, the preview is served from the existing table
+    started = []
+    monkeypatch.setattr(climatology, "_rebuild_in_background", lambda *key: started.append(key))
+    assert climatology._load_climatology("Testprovince", "precipitation") is old_table
+    assert started == [("Testprovince", "precipitation")]
+
+    # The scheduled rebuild replaces it
+    assert climatology.rebuild_climatology_if_outdated("Testprovince", "precipitation")
+    assert not climatology.rebuild_climatology_if_outdated("Testprovince", "precipitation")
+    assert "District_Gap" in climatology._load_climatology("Testprovince", "precipitation")
@@ -0,0 +1,32 @@
+import asyncio
+
+from api import task as task_api
+
+
+class ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def test_stream_closes_when_the_final_event_was_missed(monkeypatch):
+    states = iter([
+        {"state": "STARTED", "info": None},
+        {"state": "STARTED", "info": None},
+        {"state": "SUCCESS", "info": {"status": "completed"}},
+    ])
+    monkeypatch.setattr(task_api, "get_task_state", lambda task_id: next(states))
+    # No events arrive at all, as if the receiver was reconnecting when the task finished
+    monkeypatch.setattr(task_api, "subscribe", lambda task_id: asyncio.Queue())
+    monkeypatch.setattr(task_api, "unsubscribe", lambda task_id, queue: None)
+    monkeypatch.setattr(task_api, "EVENT_STREAM_KEEPALIVE_SECONDS", 0.01)
+
+    async def collect():
+        response = await task_api.stream_task_status("task-1", ConnectedRequest())
+        return [chunk async for chunk in response.body_iterator]
+
+    chunks = asyncio.run(asyncio.wait_for(collect(), timeout=5))
+
+    assert chunks[0].startswith("event: status") and '"Pending"' in chunks[0]
+    assert chunks[1] == ": keepalive\n\n"
+    assert chunks[-1].startswith("event: status") and '"completed"' in chunks[-1]
+    assert len(chunks) == 3
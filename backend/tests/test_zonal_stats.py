@@ -0,0 +1,16 @@
+import numpy as np
+import shapely
+
+from countries.cambodia import get_communes_geodataframe
+from weather.zonal_stats import SIMPLIFY_MAX_AREA_CHANGE, simplify_communes, simplify_tolerance
+
+
+def test_simplify_communes_cuts_vertices_within_the_area_limit():
+    geometries = np.asarray(get_communes_geodataframe().geometry.values, dtype=object)
+    simplified = simplify_communes(geometries, simplify_tolerance(5000))
+
+    areas = shapely.area(geometries)
+    assert (np.abs(shapely.area(simplified) - areas) / areas).max() <= SIMPLIFY_MAX_AREA_CHANGE
+    assert shapely.is_valid(simplified).all()
+    # The payload cut the setting is tuned for (see SIMPLIFY_FRACTION_OF_SCALE)
+    assert shapely.get_num_coordinates(simplified).sum() < 0.8 * shapely.get_num_coordinates(geometries).sum()
@@ -0,0 +1,189 @@
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import concurrent.futures
+import pandas as pd
+from datetime import timedelta
+from typing import Callable, Optional
+
+# Days of data per checkpointed unit of work
+CHECKPOINT_DAYS = int(os.getenv("CHECKPOINT_DAYS", "365"))
+
+# Missing checkpoint chunks of one retrieval fetched at the same time. Their GEE requests
+# all go through the process-wide executor, which bounds concurrency and request rate.
+CHECKPOINT_PARALLEL_CHUNKS = int(os.getenv("CHECKPOINT_PARALLEL_CHUNKS", "4"))
+
+_warned_local_checkpoint_dir = False
+
+
+def get_checkpoint_dir() -> str:
+    """
+    Root folder for download checkpoints (CHECKPOINT_DIR, default: system temp folder).
+
+    Point CHECKPOINT_DIR at a volume shared by the workers so a redelivered task can
+    resume on a different worker and unit results are passed by path. Without it,
+    checkpoints only help a task redelivered to the same host (logged once per process)
+    and unit results go through the result backend.
+    """
+    global _warned_local_checkpoint_dir
+    checkpoint_dir = os.getenv("CHECKPOINT_DIR")
+    if checkpoint_dir:
+        return checkpoint_dir
+    if not _warned_local_checkpoint_dir:
+        _warned_local_checkpoint_dir = True
+        print("[WARNING] CHECKPOINT_DIR is not set; download checkpoints are kept in the local temp "
+              "folder and cannot be resumed by a worker on another host")
+    return os.path.join(tempfile.gettempdir(), "weather_download_checkpoints")
+
+
+def _checkpoint_path(download_id: str, unit_key: str) -> str:
+    unit_hash = hashlib.sha1(unit_key.encode("utf-8")).hexdigest()[:20]
+    return os.path.join(get_checkpoint_dir(), str(download_id), f"{unit_hash}.parquet")
+
+
+def load_checkpoint(download_id: str, unit_key: str) -> Optional[pd.DataFrame]:
+    """Return the saved result of a unit of work, or None if it has not completed."""
+    path = _checkpoint_path(download_id, unit_key)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        # A corrupt checkpoint is treated as missing; the unit is simply fetched again
+        print(f"[WARNING] Ignoring unreadable checkpoint {path}: {str(e)}")
+        return None
+
+
+def save_checkpoint(download_id: str, unit_key: str, df: pd.DataFrame):
+    """Persist the result of a unit of work atomically (temporary file + os.replace)."""
+    path = _checkpoint_path(download_id, unit_key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(temp_path, engine="pyarrow", index=False)
+    os.replace(temp_path, path)
+
+
+def save_unit_result(download_id: str, unit_key: str, df: pd.DataFrame) -> dict:
+    """
+    Hand over the result frame of a download unit to the assembly task.
+
+    With a shared CHECKPOINT_DIR the frame is stored as Parquet beside the checkpoints
+    and only its path is returned, so large frames never go through the broker or
+    result backend. Without one, the assembly may run on another host, so the frame
+    itself is returned (as columns and rows).
+
+    Returns:
+        JSON-serialisable reference to the frame, read back with load_unit_result()
+    """
+    if not os.getenv("CHECKPOINT_DIR"):
+        return {"columns": list(df.columns), "data": df.values.tolist()}
+    save_checkpoint(download_id, f"result|{unit_key}", df)
+    return {"path": _checkpoint_path(download_id, f"result|{unit_key}")}
+
+
+def load_unit_result(unit_result: dict) -> pd.DataFrame:
+    """Read back a frame handed over with save_unit_result()."""
+    if "path" in unit_result:
+        return pd.read_parquet(unit_result["path"])
+    return pd.DataFrame(unit_result["data"], columns=unit_result["columns"])
+
+
+def clear_checkpoints(download_id: str):
+    """Remove all checkpoints of a download (after it completed or failed for good)."""
+    shutil.rmtree(os.path.join(get_checkpoint_dir(), str(download_id)), ignore_errors=True)
+
+
+def clear_stale_checkpoints(max_age_hours: float = 48) -> int:
+    """
+    Remove checkpoint folders untouched for longer than max_age_hours.
+
+    These are left behind by downloads whose worker died and that were never redelivered.
+
+    Returns:
+        Number of download folders removed
+    """
+    root = get_checkpoint_dir()
+    if not os.path.isdir(root):
+        return 0
+
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for entry in os.scandir(root):
+        if entry.is_dir() and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def checkpointed_retrieval(
+    retrieve: Callable[..., pd.DataFrame],
+    download_id: str,
+    unit_prefix: str,
+    days_per_unit: int = CHECKPOINT_DAYS,
+    max_parallel_units: int = CHECKPOINT_PARALLEL_CHUNKS
+) -> Callable[..., pd.DataFrame]:
+    """
+    Wrap a retrieval function so its work is split into checkpointed units.
+
+    The returned function has the same signature, retrieve(province_gdf, start_date,
+    end_date). It splits the range in chunks of days_per_unit days. Chunks that were
+    already saved, e.g. by an earlier attempt of a redelivered task, are loaded; the
+    missing ones are fetched in parallel (up to max_parallel_units at a time) and each
+    is saved as soon as it arrives, so a failure keeps the chunks that succeeded.
+
+    Args:
+        retrieve: Function returning a frame with a 'Date' column and one column per commune
+        download_id: Download the checkpoints belong to
+        unit_prefix: Identifies the work within the download (e.g. dataset and province)
+        days_per_unit: Days of data per checkpoint
+        max_parallel_units: Missing chunks fetched at the same time
+
+    Returns:
+        Checkpointed retrieval function
+    """
+    def fetch_unit(province_gdf, unit_key: str, unit_range) -> pd.DataFrame:
+        unit_df = retrieve(province_gdf, *unit_range)
+        save_checkpoint(download_id, unit_key, unit_df)
+        return unit_df
+
+    def run(province_gdf, start_date: str, end_date: str) -> pd.DataFrame:
+        # The selected communes are part of the key, so different gap groups never collide
+        communes_key = ",".join(f"{d}/{c}" for d, c in zip(province_gdf["NAME_2"], province_gdf["NAME_3"]))
+        end = pd.Timestamp(end_date)
+        unit_start = pd.Timestamp(start_date)
+
+        units = []
+        while unit_start < end:
+            unit_end = min(unit_start + timedelta(days=days_per_unit), end)
+            unit_range = (unit_start.strftime("%Y-%m-%d"), unit_end.strftime("%Y-%m-%d"))
+            units.append((f"{unit_prefix}|{communes_key}|{unit_range[0]}|{unit_range[1]}", unit_range))
+            unit_start = unit_end
+
+        frames = [load_checkpoint(download_id, unit_key) for unit_key, _ in units]
+        missing = [i for i, frame in enumerate(frames) if frame is None]
+        resumed = len(units) - len(missing)
+        if resumed:
+            print(f"[INFO] Resumed {resumed}/{len(units)} checkpointed units for {unit_prefix}")
+
+        if len(missing) == 1 or max_parallel_units <= 1:
+            for i in missing:
+                frames[i] = fetch_unit(province_gdf, *units[i])
+        elif missing:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_parallel_units, len(missing))) as pool:
+                futures = {i: pool.submit(fetch_unit, province_gdf, *units[i]) for i in missing}
+                try:
+                    for i, future in futures.items():
+                        frames[i] = future.result()
+                except Exception:
+                    for future in futures.values():
+                        future.cancel()
+                    raise
+
+        non_empty = [frame for frame in frames if not frame.empty]
+        if not non_empty:
+            return frames[0] if frames else pd.DataFrame(columns=["Date"])
+        return pd.concat(non_empty, ignore_index=True)
+
+    return run
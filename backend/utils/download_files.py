@@ -0,0 +1,196 @@
+# backend/utils/download_files.py
+
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+from countries.cambodia import province_to_filename
+
+# Supabase storage bucket holding the download files
+DOWNLOADS_BUCKET = "weather-data-downloads"
+
+# Rows converted to Python objects at a time while streaming a spreadsheet
+XLSX_ROWS_PER_CHUNK = 1000
+
+# Excel's hard limit on columns per worksheet
+XLSX_MAX_COLUMNS = 16384
+
+# Download file formats: file extension and content type used for the storage upload
+DOWNLOAD_FORMATS = {
+    "xlsx": {
+        "extension": "xlsx",
+        "content_type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    },
+    "parquet": {
+        "extension": "parquet",
+        "content_type": "application/vnd.apache.parquet",
+    },
+    "csv.gz": {
+        "extension": "csv.gz",
+        "content_type": "application/gzip",
+    },
+    "arrow": {
+        "extension": "arrow",
+        "content_type": "application/vnd.apache.arrow.file",
+    },
+}
+
+
+def download_request_hash(download_record: dict) -> str:
+    """
+    Canonical hash of what a weather download produces.
+
+    Two requests with the same hash yield the same file. Province order is kept (it sets
+    the column order); district and commune filters are sorted and de-duplicated, since
+    the selected rows come out in dataset order either way.
+
+    Args:
+        download_record: weather_downloads row or insert payload
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    canonical = {
+        "dataset": download_record["dataset"],
+        "provinces": list(dict.fromkeys(download_record["provinces"])),
+        "districts": sorted(set(download_record.get("districts") or [])),
+        "communes": sorted(set(download_record.get("communes") or [])),
+        "date_start": download_record["date_start"],
+        "date_end": download_record["date_end"],
+        "output_format": download_record.get("output_format") or "xlsx",
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def download_filename(download_record: dict) -> str:
+    """
+    Build the descriptive filename of a weather download.
+
+    Format: {provinces}_{dataset}_data_{start}_{end}_{download_id}.{extension}
+
+    Args:
+        download_record: weather_downloads row (output_format defaults to xlsx)
+
+    Returns:
+        Filename including the extension of the download's output format
+    """
+    output_format = download_record.get("output_format") or "xlsx"
+    provinces_str = "_".join(download_record["provinces"])
+    date_start = download_record["date_start"].replace("-", "")
+    date_end = download_record["date_end"].replace("-", "")
+    extension = DOWNLOAD_FORMATS[output_format]["extension"]
+    return f"{provinces_str}_{download_record['dataset']}_data_{date_start}_{date_end}_{download_record['id']}.{extension}"
+
+
+def download_file_path(download_record: dict) -> str:
+    """
+    Storage path of a weather download's file ({user_id}/{filename}).
+
+    Uses the stored file_path when the row has one, so renamed conventions never orphan
+    older files.
+    """
+    if download_record.get("file_path"):
+        return download_record["file_path"]
+    return f"{download_record['requested_by_user_id']}/{download_filename(download_record)}"
+
+
+def join_unit_frames(unit_frames: List[Tuple[str, pd.DataFrame]]) -> pd.DataFrame:
+    """
+    Align the retrieval units of a download on Date in a single outer join.
+
+    Commune column names ("District_Commune") are only unique within a province. A name
+    that occurs in more than one province of the download is prefixed with its province
+    (e.g. "Pursat_TonléSap_TonléSap"), so the file has unique column names; other
+    columns keep their name.
+
+    Args:
+        unit_frames: (canonical province name, frame with a Date column) per unit, in
+            output column order
+
+    Returns:
+        DataFrame with a Date column followed by every unit's commune columns
+    """
+    if not unit_frames:
+        return pd.DataFrame(columns=["Date"])
+
+    provinces_by_column = {}
+    for province, frame in unit_frames:
+        for column in frame.columns:
+            if column != "Date":
+                provinces_by_column.setdefault(column, set()).add(province)
+
+    indexed = []
+    for province, frame in unit_frames:
+        prefix = province_to_filename(province)
+        frame = frame.set_index("Date")
+        frame.columns = [
+            f"{prefix}_{column}" if len(provinces_by_column[column]) > 1 else column
+            for column in frame.columns
+        ]
+        indexed.append(frame)
+
+    all_data = pd.concat(indexed, axis=1).sort_index()
+    all_data.index.name = "Date"
+    return all_data.reset_index()
+
+
+def write_xlsx_streaming(df: pd.DataFrame, path: str, sheet_name: str = "Sheet1"):
+    """
+    Write a DataFrame to .xlsx with openpyxl's write-only mode.
+
+    Rows are streamed to disk as they are appended, so memory stays flat regardless of
+    the number of rows; only XLSX_ROWS_PER_CHUNK rows are converted to Python objects at
+    a time. NaN cells are left empty, as with DataFrame.to_excel.
+
+    Args:
+        df: DataFrame to write (the index is not written)
+        path: Destination file path
+        sheet_name: Name of the worksheet
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_name)
+    sheet.append([str(column) for column in df.columns])
+
+    for start in range(0, len(df), XLSX_ROWS_PER_CHUNK):
+        chunk = df.iloc[start:start + XLSX_ROWS_PER_CHUNK].astype(object)
+        chunk = chunk.where(pd.notna(chunk), None)
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append([value.item() if isinstance(value, np.generic) else value for value in row])
+
+    workbook.save(path)
+
+
+def write_download_file(df: pd.DataFrame, path: str, output_format: str):
+    """
+    Write an assembled download in the requested format.
+
+    Parquet and Arrow are written straight from the column arrays; CSV is gzip-compressed.
+
+    Args:
+        df: DataFrame with a 'Date' column and one column per commune
+        path: Destination file path
+        output_format: Key of DOWNLOAD_FORMATS
+
+    Raises:
+        ValueError: For an unknown format, or a spreadsheet wider than Excel allows
+    """
+    if output_format not in DOWNLOAD_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}. Available formats: {list(DOWNLOAD_FORMATS)}")
+
+    if output_format == "xlsx":
+        if len(df.columns) > XLSX_MAX_COLUMNS:
+            raise ValueError(
+                f"Download has {len(df.columns)} columns, more than the {XLSX_MAX_COLUMNS} an Excel sheet allows. "
+                "Request the parquet or csv.gz format instead."
+            )
+        write_xlsx_streaming(df, path)
+    elif output_format == "parquet":
+        df.to_parquet(path, engine="pyarrow", index=False, compression="snappy")
+    elif output_format == "csv.gz":
+        df.to_csv(path, index=False, compression="gzip")
+    elif output_format == "arrow":
+        df.reset_index(drop=True).to_feather(path)
@@ -0,0 +1,210 @@
+import os
+import time
+import threading
+from typing import Dict, Optional
+
+# Minimum seconds between two progress writes of one reporter
+PROGRESS_MIN_INTERVAL_SECONDS = float(os.getenv("PROGRESS_MIN_INTERVAL_SECONDS", "5"))
+
+# Progress counters expire with the task results
+PROGRESS_TTL_SECONDS = 86400
+
+_redis_client = None
+_redis_pid = None
+_redis_lock = threading.Lock()
+
+
+def _get_redis():
+    """Process-wide Redis client for the progress counters (same server as Celery)."""
+    global _redis_client, _redis_pid
+    import redis
+
+    with _redis_lock:
+        if _redis_client is None or _redis_pid != os.getpid():
+            _redis_client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+            _redis_pid = os.getpid()
+        return _redis_client
+
+
+def _progress_key(download_id: str) -> str:
+    return f"weather_download_progress:{download_id}"
+
+
+def init_download_progress(download_id: str, total_communes: int, total_commune_days: int, total_units: int):
+    """
+    Reset the progress counters of a download before its units are dispatched.
+
+    Work is measured in commune-days; units add to the shared counters as they go, so
+    parallel units report one combined progress.
+    """
+    key = _progress_key(download_id)
+    client = _get_redis()
+    pipeline = client.pipeline()
+    pipeline.delete(key)
+    pipeline.hset(key, mapping={
+        "total_communes": total_communes,
+        "total_work": total_commune_days,
+        "total_units": total_units,
+        "communes_done": 0,
+        "work_done": 0,
+        "units_started": 0,
+        "units_done": 0,
+        "batches_done": 0,
+        "batch_work": 0,
+        "batch_seconds": 0,
+    })
+    pipeline.expire(key, PROGRESS_TTL_SECONDS)
+    pipeline.execute()
+
+
+def _dispatch_key(download_id: str) -> str:
+    return f"weather_download_dispatch:{download_id}"
+
+
+def get_download_dispatch(download_id: str) -> Optional[str]:
+    """ID of the chord already dispatched for a download, or None."""
+    chord_id = _get_redis().get(_dispatch_key(download_id))
+    return chord_id.decode() if chord_id else None
+
+
+def record_download_dispatch(download_id: str, chord_id: str):
+    """Remember the chord dispatched for a download, so a redelivered data_task does not dispatch it again."""
+    _get_redis().set(_dispatch_key(download_id), chord_id, ex=PROGRESS_TTL_SECONDS)
+
+
+def progress_snapshot(counters: Dict[str, float]) -> Dict:
+    """
+    Turn raw progress counters into the published progress.
+
+    The ETA comes from the measured per-batch latency: remaining commune-days at the
+    observed commune-days per batch, times the mean batch time, divided by the number
+    of units currently running in parallel.
+    """
+    total_work = counters.get("total_work", 0)
+    work_done = min(counters.get("work_done", 0), total_work)
+    remaining = total_work - work_done
+
+    eta_seconds = None
+    if counters.get("batches_done", 0) and counters.get("batch_work", 0):
+        mean_batch_seconds = counters["batch_seconds"] / counters["batches_done"]
+        work_per_batch = counters["batch_work"] / counters["batches_done"]
+        running_units = max(1, counters.get("units_started", 0) - counters.get("units_done", 0))
+        eta_seconds = round(remaining / work_per_batch * mean_batch_seconds / running_units)
+    elif total_work and not remaining:
+        eta_seconds = 0
+
+    return {
+        "communes_done": int(counters.get("communes_done", 0)),
+        "communes_total": int(counters.get("total_communes", 0)),
+        "batches_done": int(counters.get("batches_done", 0)),
+        "units_done": int(counters.get("units_done", 0)),
+        "units_total": int(counters.get("total_units", 0)),
+        "percent": round(100.0 * work_done / total_work, 1) if total_work else 0.0,
+        "eta_seconds": eta_seconds,
+    }
+
+
+class ProgressReporter:
+    """
+    Throttled progress reporting of one retrieval unit of a weather download.
+
+    Counters are updated on every batch; the combined progress is written to the
+    weather_downloads row (progress column) and the Celery task state (PROGRESS) at
+    most once every min_interval seconds per download, however many units run in
+    parallel (a Redis key shared by the units), plus once when each unit starts and
+    finishes.
+    """
+
+    def __init__(self, download_id: str, unit_communes: int, unit_work: int, task=None,
+                 min_interval: float = PROGRESS_MIN_INTERVAL_SECONDS):
+        self.download_id = download_id
+        self.unit_communes = unit_communes
+        self.unit_work = unit_work
+        self.task = task
+        self.min_interval = min_interval
+        self._reported_work = 0
+        self._last_publish = 0.0
+        self._lock = threading.Lock()
+
+    def _increment(self, fields: Dict[str, float]) -> Optional[Dict[str, float]]:
+        """Add to the shared counters and return all of them (None if Redis is unavailable)."""
+        key = _progress_key(self.download_id)
+        try:
+            pipeline = _get_redis().pipeline()
+            for field, amount in fields.items():
+                pipeline.hincrbyfloat(key, field, amount)
+            pipeline.hgetall(key)
+            counters = pipeline.execute()[-1]
+        except Exception as e:
+            # Progress is informational; never fail the download over it
+            print(f"[WARNING] Failed to update progress counters for download {self.download_id}: {str(e)}")
+            return None
+        return {k.decode(): float(v) for k, v in counters.items()}
+
+    def start(self):
+        """Mark the unit as running (used for the parallelism of the ETA)."""
+        self._publish(self._increment({"units_started": 1}), force=True)
+
+    def batch_done(self, communes: int, commune_days: int, seconds: float):
+        """Record one retrieval batch and publish if the throttle interval has passed."""
+        with self._lock:
+            self._reported_work += commune_days
+        counters = self._increment({
+            "work_done": commune_days,
+            "batches_done": 1,
+            "batch_work": commune_days,
+            "batch_seconds": seconds,
+        })
+        self._publish(counters)
+
+    def unit_done(self):
+        """Count the whole unit as done (days served by the store or checkpoints included)."""
+        with self._lock:
+            remaining = max(0, self.unit_work - self._reported_work)
+            self._reported_work = self.unit_work
+        counters = self._increment({
+            "work_done": remaining,
+            "communes_done": self.unit_communes,
+            "units_done": 1,
+        })
+        self._publish(counters, force=True)
+
+    def _claim_publish(self) -> bool:
+        """Take the download's publish slot for min_interval seconds (False if another unit holds it)."""
+        try:
+            return bool(_get_redis().set(
+                f"{_progress_key(self.download_id)}:publish", 1, nx=True, px=max(1, int(self.min_interval * 1000))
+            ))
+        except Exception as e:
+            # Fall back to this unit's own throttle
+            print(f"[WARNING] Failed to claim progress publish for download {self.download_id}: {str(e)}")
+            now = time.monotonic()
+            with self._lock:
+                if now - self._last_publish < self.min_interval:
+                    return False
+                self._last_publish = now
+            return True
+
+    def _publish(self, counters: Optional[Dict[str, float]], force: bool = False):
+        if counters is None:
+            return
+        if not force and not self._claim_publish():
+            return
+
+        progress = progress_snapshot(counters)
+        try:
+            from utils.supabase_client import get_supabase_client
+            get_supabase_client().table("weather_downloads")\
+                .update({"progress": progress})\
+                .eq("id", self.download_id)\
+                .execute()
+        except Exception as e:
+            print(f"[WARNING] Failed to write progress for download {self.download_id}: {str(e)}")
+
+        if self.task is not None:
+            try:
+                self.task.update_state(state="PROGRESS", meta=progress)
+                # Pushed to the streaming status endpoint (/api/tasks/{task_id}/events)
+                self.task.send_event("task-progress", progress=progress)
+            except Exception as e:
+                print(f"[WARNING] Failed to publish task progress for download {self.download_id}: {str(e)}")
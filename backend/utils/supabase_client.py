@@ -1,25 +1,80 @@
 from supabase import create_client, Client
 import os
+import threading
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Rows per bulk update request (keeps the id=in.(...) filter well under URL length limits)
+BULK_UPDATE_CHUNK_SIZE = 200
+
+# Process-wide client; its HTTP sessions keep connections alive across requests and tasks.
+# Keyed by process id so a forked worker never reuses its parent's sockets.
+_client: Optional[Client] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
 def get_supabase_client() -> Client:
     """
-    Create and return a Supabase client instance.
-    
+    Return the process-wide Supabase client, creating it on first use.
+
+    The client is shared by all threads of the process and re-created after a fork.
+
     Returns:
         Client: Configured Supabase client
-        
+
     Raises:
         ValueError: If required environment variables are not set
     """
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-    
-    if not url:
-        raise ValueError("SUPABASE_URL environment variable is required")
-    if not key:
-        raise ValueError("SUPABASE_SERVICE_ROLE_KEY environment variable is required")
-    
-    return create_client(url, key)
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            url = os.getenv("SUPABASE_URL")
+            key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+            if not url:
+                raise ValueError("SUPABASE_URL environment variable is required")
+            if not key:
+                raise ValueError("SUPABASE_SERVICE_ROLE_KEY environment variable is required")
+
+            _client = create_client(url, key)
+            _client_pid = pid
+        return _client
+
+
+def reset_supabase_client():
+    """Drop the process-wide client (e.g. in a freshly forked worker process)."""
+    global _client, _client_pid
+    with _client_lock:
+        _client = None
+        _client_pid = None
+
+
+def bulk_update(table: str, ids: List[str], values: Dict, chunk_size: int = BULK_UPDATE_CHUNK_SIZE) -> int:
+    """
+    Apply the same update to many rows with one request per chunk of ids.
+
+    Args:
+        table: Table name
+        ids: Primary keys of the rows to update
+        values: Column values to set
+        chunk_size: Ids per request
+
+    Returns:
+        int: Number of ids submitted
+    """
+    supabase = get_supabase_client()
+    ids = list(dict.fromkeys(ids))
+    for start in range(0, len(ids), chunk_size):
+        supabase.table(table)\
+            .update(values)\
+            .in_("id", ids[start:start + chunk_size])\
+            .execute()
+    return len(ids)
@@ -0,0 +1,110 @@
+# backend/utils/task_events.py
+
+import time
+import asyncio
+import threading
+from typing import Dict, Set, Tuple
+
+# Celery event type -> task state pushed to subscribers
+EVENT_STATES = {
+    "task-received": "RECEIVED",
+    "task-started": "STARTED",
+    "task-progress": "PROGRESS",
+    "task-retried": "RETRY",
+    "task-succeeded": "SUCCESS",
+    "task-failed": "FAILURE",
+    "task-rejected": "REJECTED",
+    "task-revoked": "REVOKED",
+}
+
+# States after which a task emits no further events
+TERMINAL_STATES = {"SUCCESS", "FAILURE", "REJECTED", "REVOKED"}
+
+# Seconds to wait before reconnecting the event receiver after an error
+RECEIVER_RETRY_SECONDS = 5
+
+# task_id -> subscriber queues (with the event loop each queue belongs to)
+_subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+_subscribers_lock = threading.Lock()
+_receiver_thread = None
+
+
+def _dispatch(event: dict):
+    """Fan a Celery task event out to the subscribers of its task (receiver thread)."""
+    state = EVENT_STATES.get(event.get("type"))
+    task_id = event.get("uuid")
+    if state is None or task_id is None:
+        return
+
+    with _subscribers_lock:
+        targets = list(_subscribers.get(task_id, ()))
+    if not targets:
+        return
+
+    update = {"state": state, "info": event.get("progress") if state == "PROGRESS" else None}
+    for loop, queue in targets:
+        loop.call_soon_threadsafe(queue.put_nowait, update)
+
+
+def _run_receiver():
+    """Consume Celery task events forever, reconnecting after broker errors."""
+    from celery_worker import celery_app
+
+    handlers = {event_type: _dispatch for event_type in EVENT_STATES}
+    while True:
+        try:
+            with celery_app.connection() as connection:
+                receiver = celery_app.events.Receiver(connection, handlers=handlers)
+                receiver.capture(limit=None, timeout=None, wakeup=False)
+        except Exception as e:
+            print(f"[WARNING] Task event receiver stopped: {str(e)}; reconnecting in {RECEIVER_RETRY_SECONDS}s")
+            time.sleep(RECEIVER_RETRY_SECONDS)
+
+
+def start_receiver():
+    """
+    Start the process-wide event receiver thread (no-op if it is running).
+
+    Called at app startup: Celery's event queue only exists while the receiver is
+    connected, so events sent before it connects are lost. subscribe() also calls it
+    to restart a receiver thread that died.
+    """
+    global _receiver_thread
+    with _subscribers_lock:
+        if _receiver_thread is None or not _receiver_thread.is_alive():
+            _receiver_thread = threading.Thread(target=_run_receiver, name="celery-task-events", daemon=True)
+            _receiver_thread.start()
+
+
+def subscribe(task_id: str) -> asyncio.Queue:
+    """
+    Subscribe the running event loop to the state changes of a task.
+
+    One receiver thread per process listens to the Celery event stream and pushes
+    {"state": ..., "info": ...} updates onto the queues of the task's subscribers.
+    Call unsubscribe() with the returned queue when done. Events sent while the
+    receiver is (re)connecting are lost, so callers re-check the stored state when the
+    queue stays quiet.
+
+    Args:
+        task_id: The ID of the Celery task
+
+    Returns:
+        asyncio.Queue receiving the task's state updates
+    """
+    start_receiver()
+    queue = asyncio.Queue()
+    with _subscribers_lock:
+        _subscribers.setdefault(task_id, set()).add((asyncio.get_running_loop(), queue))
+    return queue
+
+
+def unsubscribe(task_id: str, queue: asyncio.Queue):
+    """Remove a subscriber queue returned by subscribe()."""
+    with _subscribers_lock:
+        subscribers = _subscribers.get(task_id)
+        if not subscribers:
+            return
+        subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+        if not subscribers:
+            del _subscribers[task_id]
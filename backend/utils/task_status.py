@@ -0,0 +1,43 @@
+# backend/utils/task_status.py
+
+
+def get_task_state(task_id: str) -> dict:
+    """
+    Read a Celery task's state and result/info from the result backend.
+
+    One backend lookup (AsyncResult.state followed by .info costs two while the task is
+    still running). This call blocks; from async handlers run it with
+    fastapi.concurrency.run_in_threadpool.
+
+    Args:
+        task_id: The ID of the Celery task
+
+    Returns:
+        dict: {"state": ..., "info": ...}; info is the result, the exception or the
+        progress metadata, depending on the state
+    """
+    from celery_worker import celery_app
+
+    meta = celery_app.backend.get_task_meta(task_id)
+    return {"state": meta.get("status", "PENDING"), "info": meta.get("result")}
+
+
+def task_status_response(task_id: str, state: str, info) -> dict:
+    """
+    Status payload of the task endpoints (GET /api/tasks/{task_id} and its event stream).
+
+    PENDING, RECEIVED, STARTED, RETRY and PROGRESS are reported as "Pending" (PROGRESS adds
+    the progress metadata), SUCCESS with its result, anything else as "Failure".
+    """
+    if state in ("PENDING", "RECEIVED", "STARTED", "RETRY", "PROGRESS"):
+        # Task is still in progress (PROGRESS carries percent complete and ETA)
+        response = {"task_id": task_id, "status": "Pending", "result": None}
+        if state == "PROGRESS":
+            response["progress"] = info
+    elif state == "SUCCESS":
+        # Task is completed successfully
+        response = {"task_id": task_id, "status": state, "result": info}
+    else:
+        # Task failed
+        response = {"task_id": task_id, "status": "Failure", "result": str(info)}  # This will contain the error message
+    return response
@@ -0,0 +1,203 @@
+# backend/weather/datasets.py
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from weather.gee_executor import GeeRequestExecutor
+from weather.offline_zonal import retrieve_offline_zonal_means
+from weather.zonal_stats import DEFAULT_RETRIEVAL_MODE, retrieve_commune_means, retrieve_zonal_means
+
+# Daily gridded datasets served as commune means.
+# - collection / band / scale: Earth Engine ImageCollection, band and reduction scale (m)
+# - reducer: spatial reducer over the commune polygon (area mean)
+# - factor / offset: unit conversion applied to the means (value * factor + offset)
+# - missing_value: value written where a commune has no data for a day (None keeps NaN)
+# - offline_variable: NetCDF variable name for the offline engine (None = first variable)
+# - decimals / zero_below: download formatting (rounding, and values below the threshold set to 0)
+DATASETS = {
+    "precipitation": {
+        "collection": "UCSB-CHG/CHIRPS/DAILY",
+        "band": "precipitation",
+        "reducer": "mean",
+        "scale": 5000,
+        "factor": 1.0,
+        "offset": 0.0,
+        "missing_value": None,
+        "offline_variable": "precip",
+        "decimals": 2,
+        "zero_below": 1.0,  # < 1 mm counts as a dry day
+    },
+    "temperature": {
+        "collection": "ECMWF/ERA5_LAND/DAILY_AGGR",
+        "band": "temperature_2m_max",
+        "reducer": "mean",
+        "scale": 5000,
+        "factor": 1.0,
+        "offset": -273.15,  # Kelvin to Celsius
+        "missing_value": -999,
+        "offline_variable": "temperature_2m_max",
+        "decimals": 1,
+        "zero_below": None,
+    },
+    "temperature_min": {
+        "collection": "ECMWF/ERA5_LAND/DAILY_AGGR",
+        "band": "temperature_2m_min",
+        "reducer": "mean",
+        "scale": 5000,
+        "factor": 1.0,
+        "offset": -273.15,
+        "missing_value": -999,
+        "offline_variable": "temperature_2m_min",
+        "decimals": 1,
+        "zero_below": None,
+    },
+    "temperature_mean": {
+        "collection": "ECMWF/ERA5_LAND/DAILY_AGGR",
+        "band": "temperature_2m",
+        "reducer": "mean",
+        "scale": 5000,
+        "factor": 1.0,
+        "offset": -273.15,
+        "missing_value": -999,
+        "offline_variable": "temperature_2m",
+        "decimals": 1,
+        "zero_below": None,
+    },
+}
+
+
+def get_dataset(name: str) -> Dict:
+    """
+    Look up a dataset definition by name.
+
+    Raises:
+        ValueError: If the dataset is not registered
+    """
+    dataset = DATASETS.get(name)
+    if dataset is None:
+        raise ValueError(f"Unsupported dataset type: {name}. Available datasets: {list(DATASETS)}")
+    return dataset
+
+
+def _to_output_units(values: pd.DataFrame, dataset: Dict) -> pd.DataFrame:
+    """Apply the dataset's unit conversion and missing-value marker to a Date-indexed frame."""
+    if dataset["factor"] != 1.0 or dataset["offset"] != 0.0:
+        values = values * dataset["factor"] + dataset["offset"]
+    if dataset["missing_value"] is not None:
+        values = values.fillna(dataset["missing_value"])
+    return values
+
+
+def format_output_values(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    Apply a dataset's download formatting to every commune column at once.
+
+    Values are rounded to the dataset's decimals, and values below zero_below (if set)
+    become 0. NaN and the missing-value marker (e.g. -999) are preserved.
+
+    Args:
+    - df: DataFrame with a 'Date' column and one numeric column per commune.
+    - name: Dataset name from DATASETS.
+
+    Returns:
+    - The formatted DataFrame (the input is not modified).
+    """
+    dataset = get_dataset(name)
+    value_positions = [i for i, c in enumerate(df.columns) if c != "Date"]
+    if not value_positions:
+        return df
+
+    values = df.iloc[:, value_positions].to_numpy(dtype=np.float64)
+    formatted = np.round(values, dataset["decimals"])
+    if dataset["zero_below"] is not None:
+        # NaN compares False, so missing values pass through unchanged
+        below = values < dataset["zero_below"]
+        if dataset["missing_value"] is not None:
+            below &= values != dataset["missing_value"]
+        formatted[below] = 0.0
+
+    result = pd.DataFrame(formatted, columns=df.columns[value_positions], index=df.index)
+    if "Date" in df.columns:
+        result.insert(0, "Date", df["Date"])
+    return result
+
+
+def retrieve_datasets(
+    province_gdf,
+    start_date: str,
+    end_date: str,
+    names: List[str],
+    mode: str = DEFAULT_RETRIEVAL_MODE,
+    executor: Optional[GeeRequestExecutor] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Retrieve daily commune means for one or more registered datasets.
+
+    Datasets that share a collection and scale (e.g. ERA5-Land max and min temperature)
+    are fetched together, reducing all their bands over the same geometries in a single
+    pass.
+
+    Args:
+    - province_gdf: GeoDataFrame containing the commune geometries.
+    - start_date: The start date in the format 'YYYY-MM-DD'.
+    - end_date: The end date in the format 'YYYY-MM-DD' (exclusive).
+    - names: Dataset names from DATASETS.
+    - mode: "reduce_regions", "per_commune" or "offline" (see weather.zonal_stats).
+    - executor: Optional GeeRequestExecutor; defaults to one configured from the environment.
+
+    Returns:
+    - Dict of dataset name -> DataFrame with a 'Date' column ('YYYY-MM-DD') and one
+      column per commune, in output units.
+    """
+    datasets = {name: get_dataset(name) for name in names}
+    if mode not in ("reduce_regions", "per_commune", "offline"):
+        raise ValueError(f"Unsupported retrieval mode: {mode}")
+
+    raw_frames: Dict[str, pd.DataFrame] = {}
+    if mode == "offline":
+        for name, dataset in datasets.items():
+            if dataset["reducer"] != "mean":
+                raise ValueError(f"The offline engine only computes area means, not '{dataset['reducer']}' ({name})")
+            raw_frames[name] = retrieve_offline_zonal_means(
+                province_gdf, start_date, end_date,
+                dataset=name,
+                variable=dataset["offline_variable"]
+            ).set_index("Date")
+    else:
+        # Group datasets by what can be reduced in one pass: same collection, scale and reducer
+        groups: Dict[tuple, List[str]] = {}
+        for name, dataset in datasets.items():
+            groups.setdefault((dataset["collection"], dataset["scale"], dataset["reducer"]), []).append(name)
+
+        retrieve = retrieve_zonal_means if mode == "reduce_regions" else retrieve_commune_means
+        for (collection, scale, reducer), group in groups.items():
+            bands = list(dict.fromkeys(datasets[name]["band"] for name in group))
+            band_frames = retrieve(
+                province_gdf, start_date, end_date,
+                collection_id=collection,
+                bands=bands,
+                scale=scale,
+                reducer=reducer,
+                executor=executor
+            )
+            for name in group:
+                raw_frames[name] = band_frames[datasets[name]["band"]]
+
+    results = {}
+    for name in names:
+        result_df = _to_output_units(raw_frames[name], datasets[name])
+        result_df.columns.name = None
+        results[name] = result_df.reset_index()
+    return results
+
+
+def retrieve_dataset(
+    province_gdf,
+    start_date: str,
+    end_date: str,
+    name: str,
+    mode: str = DEFAULT_RETRIEVAL_MODE,
+    executor: Optional[GeeRequestExecutor] = None
+) -> pd.DataFrame:
+    """Retrieve daily commune means for a single registered dataset (see retrieve_datasets)."""
+    return retrieve_datasets(province_gdf, start_date, end_date, [name], mode=mode, executor=executor)[name]
@@ -0,0 +1,175 @@
+# backend/weather/gee_executor.py
+
+import os
+import re
+import time
+import random
+import threading
+import concurrent.futures
+from typing import Callable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Substrings of Earth Engine / HTTP error messages that indicate a quota or transient failure
+RETRYABLE_ERROR_MARKERS = (
+    "too many concurrent",
+    "too many requests",
+    "rate limit",
+    "quota",
+    "internal error",
+    "service unavailable",
+    "temporarily unavailable",
+    "timed out",
+    "timeout",
+    "deadline exceeded",
+    "connection reset",
+    "connection aborted",
+)
+
+# HTTP status codes worth retrying, matched as whole numbers in the error message
+RETRYABLE_STATUS_PATTERN = re.compile(r"\b(429|500|502|503|504)\b")
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Whether a failed Earth Engine call is worth retrying (quota or transient error)."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    message = str(error).lower()
+    if RETRYABLE_STATUS_PATTERN.search(message):
+        return True
+    return any(marker in message for marker in RETRYABLE_ERROR_MARKERS)
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`; acquire()
+    blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, waiting for the bucket to refill if it is empty."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class GeeRequestExecutor:
+    """
+    Run Earth Engine requests with bounded concurrency, rate limiting and retries.
+
+    Requests are passed as zero-argument callables (e.g. `lambda: computation.getInfo()`),
+    so the executor has no Earth Engine dependency and can be driven by a fake client.
+    Quota and transient failures are retried with exponential backoff and full jitter.
+    At most max_concurrency requests run at once across all map() and call() callers
+    sharing the executor.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_second: float = 10.0,
+        burst: Optional[float] = None,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        jitter: Callable[[], float] = random.random
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._jitter = jitter
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._bucket = TokenBucket(
+            requests_per_second,
+            burst if burst is not None else max(1.0, requests_per_second),
+            clock=clock,
+            sleep=sleep
+        )
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (0-based): full jitter over a capped exponential."""
+        return self._jitter() * min(self.max_delay, self.base_delay * (2 ** attempt))
+
+    def call(self, request: Callable[[], T]) -> T:
+        """Run one request, rate-limited, retrying quota/transient errors."""
+        attempt = 0
+        while True:
+            self._bucket.acquire()
+            try:
+                with self._slots:
+                    return request()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    raise
+                delay = self.backoff_delay(attempt)
+                print(f"[WARNING] GEE request failed ({str(e)[:200]}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                self._sleep(delay)
+                attempt += 1
+
+    def map(self, requests: List[Callable[[], T]]) -> List[T]:
+        """
+        Run requests concurrently and return their results in input order.
+
+        The first request that still fails after its retries is re-raised.
+        """
+        if self.max_concurrency == 1 or len(requests) <= 1:
+            return [self.call(request) for request in requests]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = [pool.submit(self.call, request) for request in requests]
+            try:
+                return [future.result() for future in futures]
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+
+_gee_executor: Optional[GeeRequestExecutor] = None
+_gee_executor_pid = None
+_gee_executor_lock = threading.Lock()
+
+
+def get_gee_executor() -> GeeRequestExecutor:
+    """
+    Process-wide executor configured from environment variables.
+
+    Shared by every retrieval in the process, so concurrent retrievals (e.g. checkpoint
+    chunks fetched in parallel) stay within one concurrency limit and request rate.
+    """
+    global _gee_executor, _gee_executor_pid
+    with _gee_executor_lock:
+        # Recreated after a fork: locks and semaphores copied from the parent are not shared
+        if _gee_executor is None or _gee_executor_pid != os.getpid():
+            _gee_executor_pid = os.getpid()
+            _gee_executor = GeeRequestExecutor(
+                max_concurrency=int(os.getenv("GEE_MAX_CONCURRENCY", "8")),
+                requests_per_second=float(os.getenv("GEE_REQUESTS_PER_SECOND", "10")),
+                burst=float(os.getenv("GEE_REQUEST_BURST")) if os.getenv("GEE_REQUEST_BURST") else None,
+                max_retries=int(os.getenv("GEE_MAX_RETRIES", "5")),
+                base_delay=float(os.getenv("GEE_BACKOFF_BASE_SECONDS", "1")),
+                max_delay=float(os.getenv("GEE_BACKOFF_MAX_SECONDS", "60"))
+            )
+        return _gee_executor
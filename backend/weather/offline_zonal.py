@@ -0,0 +1,331 @@
+# backend/weather/offline_zonal.py
+#
+# Offline stand-in for the Earth Engine reductions: daily commune means computed from
+# local gridded rasters (e.g. CHIRPS or ERA5-Land exported as GeoTIFF or NetCDF).
+#
+# Dependencies (in requirements.txt), imported lazily so the API does not load them:
+# scipy (sparse weights), rasterio (GeoTIFF), xarray + netCDF4 (NetCDF).
+
+import os
+import re
+import glob
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from countries.cambodia import get_communes_geodataframe, ordered_communes, to_climate_column_name
+
+# Days read and reduced per chunk (one sparse x dense product per chunk)
+DAYS_PER_CHUNK = int(os.getenv("OFFLINE_DAYS_PER_CHUNK", "366"))
+
+# Date embedded in daily GeoTIFF names: chirps-v2.0.1993.01.01.tif, era5_19930101.tif, ...
+_DATE_IN_FILENAME = re.compile(r"(\d{4})[._-]?(\d{2})[._-]?(\d{2})")
+
+# Weight matrices keyed by grid signature: (csr matrix, {column_name: row})
+_weight_matrix_cache: Dict[tuple, Tuple[object, Dict[str, int]]] = {}
+_weight_matrix_lock = threading.Lock()
+
+
+def get_offline_raster_root() -> str:
+    """Folder holding one sub-folder of rasters per dataset, e.g. climate_rasters/precipitation/."""
+    return os.getenv("OFFLINE_RASTER_ROOT", os.path.join(os.getcwd(), "climate_rasters"))
+
+
+class RasterGrid:
+    """
+    Regular lon/lat grid of the pixels that are read: origin (x0, y0) is the outer corner
+    of pixel (0, 0); dx/dy are signed pixel sizes (dy is negative for north-up rasters).
+    """
+
+    def __init__(self, x0: float, y0: float, dx: float, dy: float, width: int, height: int):
+        self.x0, self.y0, self.dx, self.dy = float(x0), float(y0), float(dx), float(dy)
+        self.width, self.height = int(width), int(height)
+
+    @property
+    def signature(self) -> tuple:
+        return (round(self.x0, 9), round(self.y0, 9), round(self.dx, 12), round(self.dy, 12), self.width, self.height)
+
+    def window_for_bounds(self, minx: float, miny: float, maxx: float, maxy: float) -> Tuple[int, int, int, int]:
+        """(row_start, row_stop, col_start, col_stop) of the pixels touching a bounding box."""
+        cols = sorted(((minx - self.x0) / self.dx, (maxx - self.x0) / self.dx))
+        rows = sorted(((miny - self.y0) / self.dy, (maxy - self.y0) / self.dy))
+        col_start = max(0, int(np.floor(cols[0])))
+        col_stop = min(self.width, int(np.ceil(cols[1])))
+        row_start = max(0, int(np.floor(rows[0])))
+        row_stop = min(self.height, int(np.ceil(rows[1])))
+        return row_start, row_stop, col_start, col_stop
+
+    def subgrid(self, row_start: int, row_stop: int, col_start: int, col_stop: int) -> "RasterGrid":
+        return RasterGrid(
+            self.x0 + col_start * self.dx, self.y0 + row_start * self.dy,
+            self.dx, self.dy, col_stop - col_start, row_stop - row_start
+        )
+
+
+def _pixel_weights(geometry, grid: RasterGrid) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Flat pixel indices and intersection areas of the grid cells overlapping a polygon.
+
+    Areas are in squared degrees; they are only used as relative weights within a commune.
+    """
+    import shapely
+
+    row_start, row_stop, col_start, col_stop = grid.window_for_bounds(*geometry.bounds)
+    if row_start >= row_stop or col_start >= col_stop:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    rows, cols = np.meshgrid(np.arange(row_start, row_stop), np.arange(col_start, col_stop), indexing="ij")
+    rows, cols = rows.ravel(), cols.ravel()
+    cells = shapely.box(
+        grid.x0 + cols * grid.dx, grid.y0 + rows * grid.dy,
+        grid.x0 + (cols + 1) * grid.dx, grid.y0 + (rows + 1) * grid.dy
+    )
+    shapely.prepare(geometry)
+    areas = shapely.area(shapely.intersection(cells, geometry))
+    keep = areas > 0
+    return rows[keep] * grid.width + cols[keep], areas[keep]
+
+
+def build_weight_matrix(geometries: List[object], grid: RasterGrid):
+    """
+    Sparse (commune x pixel) matrix of polygon/pixel intersection areas.
+
+    Row i holds the area of each grid cell covered by geometries[i], so a weighted mean
+    over valid pixels is (W @ values) / (W @ valid).
+    """
+    from scipy import sparse
+
+    indptr = [0]
+    indices = []
+    data = []
+    for geometry in geometries:
+        pixel_idx, areas = _pixel_weights(geometry, grid)
+        indices.append(pixel_idx)
+        data.append(areas)
+        indptr.append(indptr[-1] + len(pixel_idx))
+
+    return sparse.csr_matrix(
+        (np.concatenate(data) if data else np.empty(0), np.concatenate(indices) if indices else np.empty(0, dtype=np.int64), np.asarray(indptr)),
+        shape=(len(geometries), grid.width * grid.height)
+    )
+
+
+def _weights_cache_path(grid: RasterGrid, fingerprint: str) -> str:
+    key = hashlib.sha1(f"{grid.signature}:{fingerprint}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(get_offline_raster_root(), "weights", f"commune_weights_{key}.npz")
+
+
+def get_commune_weight_matrix(grid: RasterGrid):
+    """
+    Weight matrix over every commune in the boundaries dataset for a raster grid.
+
+    Built once per grid and process, and persisted next to the rasters so later
+    processes only load it. The on-disk copy is keyed by the grid and a hash of the
+    commune geometries, so changed boundaries produce a new matrix.
+
+    Returns:
+        Tuple of (csr matrix, {climate column name: row})
+    """
+    cached = _weight_matrix_cache.get(grid.signature)
+    if cached is not None:
+        return cached
+
+    with _weight_matrix_lock:
+        cached = _weight_matrix_cache.get(grid.signature)
+        if cached is not None:
+            return cached
+
+        import shapely
+        from scipy import sparse
+
+        communes_gdf = get_communes_geodataframe()
+        columns = []
+        geometries = []
+        seen = set()
+        for district, commune, geometry in zip(communes_gdf["NAME_2"], communes_gdf["NAME_3"], communes_gdf.geometry):
+            column_name = to_climate_column_name(district, commune)
+            if geometry is None or column_name in seen:
+                continue
+            seen.add(column_name)
+            columns.append(column_name)
+            geometries.append(geometry)
+
+        fingerprint = hashlib.sha1(b"".join(shapely.to_wkb(np.asarray(geometries, dtype=object)).tolist())).hexdigest()
+        cache_path = _weights_cache_path(grid, fingerprint)
+        if os.path.exists(cache_path):
+            print(f"[INFO] Loading commune weight matrix: {cache_path}")
+            stored = np.load(cache_path, allow_pickle=False)
+            matrix = sparse.csr_matrix((stored["data"], stored["indices"], stored["indptr"]), shape=tuple(stored["shape"]))
+            columns = stored["columns"].tolist()
+        else:
+            print(f"[INFO] Building commune weight matrix for {len(geometries)} communes on a {grid.height}x{grid.width} grid")
+            matrix = build_weight_matrix(geometries, grid)
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+            np.savez_compressed(
+                temp_path, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+                shape=np.asarray(matrix.shape), columns=np.asarray(columns)
+            )
+            os.replace(temp_path, cache_path)
+
+        result = (matrix, {column_name: row for row, column_name in enumerate(columns)})
+        _weight_matrix_cache[grid.signature] = result
+        return result
+
+
+def _dated_geotiffs(folder: str, start: pd.Timestamp, end: pd.Timestamp) -> List[Tuple[pd.Timestamp, str]]:
+    """Daily GeoTIFFs in a folder whose filename date falls in [start, end)."""
+    files = []
+    for path in glob.glob(os.path.join(folder, "*.tif")) + glob.glob(os.path.join(folder, "*.tiff")):
+        match = _DATE_IN_FILENAME.search(os.path.basename(path))
+        if not match:
+            continue
+        date = pd.Timestamp(datetime(*map(int, match.groups())))
+        if start <= date < end:
+            files.append((date, path))
+    return sorted(files)
+
+
+def _read_geotiff_days(files: List[Tuple[pd.Timestamp, str]], bounds: Tuple[float, float, float, float]):
+    """
+    Yield (grid, dates, values[days, pixels]) chunks from daily single-band GeoTIFFs,
+    reading only the window that covers `bounds`. Nodata pixels are NaN.
+    """
+    import rasterio
+    from rasterio.windows import Window
+
+    with rasterio.open(files[0][1]) as first:
+        transform = first.transform
+        full_grid = RasterGrid(transform.c, transform.f, transform.a, transform.e, first.width, first.height)
+    row_start, row_stop, col_start, col_stop = full_grid.window_for_bounds(*bounds)
+    grid = full_grid.subgrid(row_start, row_stop, col_start, col_stop)
+    window = Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+
+    for chunk_start in range(0, len(files), DAYS_PER_CHUNK):
+        chunk = files[chunk_start:chunk_start + DAYS_PER_CHUNK]
+        values = np.empty((len(chunk), grid.width * grid.height), dtype=np.float64)
+        for day, (_, path) in enumerate(chunk):
+            with rasterio.open(path) as src:
+                band = src.read(1, window=window).astype(np.float64)
+                if src.nodata is not None:
+                    band[band == src.nodata] = np.nan
+            values[day] = band.ravel()
+        yield grid, [date for date, _ in chunk], values
+
+
+def _read_netcdf_days(paths: List[str], variable: Optional[str], start: pd.Timestamp, end: pd.Timestamp, bounds: Tuple[float, float, float, float]):
+    """
+    Yield (grid, dates, values[days, pixels]) chunks from NetCDF stacks with a time
+    dimension and 1-D lat/lon (or latitude/longitude) coordinates.
+    """
+    import xarray as xr
+
+    for path in sorted(paths):
+        with xr.open_dataset(path) as dataset:
+            name = variable or list(dataset.data_vars)[0]
+            data = dataset[name]
+            lon_name = "lon" if "lon" in data.coords else "longitude"
+            lat_name = "lat" if "lat" in data.coords else "latitude"
+            data = data.sel(time=slice(start, end - pd.Timedelta(days=1)))
+            if data.sizes.get("time", 0) == 0:
+                continue
+
+            lons = data[lon_name].values
+            lats = data[lat_name].values
+            dx = float(lons[1] - lons[0])
+            dy = float(lats[1] - lats[0])
+            full_grid = RasterGrid(lons[0] - dx / 2, lats[0] - dy / 2, dx, dy, len(lons), len(lats))
+            row_start, row_stop, col_start, col_stop = full_grid.window_for_bounds(*bounds)
+            grid = full_grid.subgrid(row_start, row_stop, col_start, col_stop)
+            data = data.isel({lat_name: slice(row_start, row_stop), lon_name: slice(col_start, col_stop)})
+            data = data.transpose("time", lat_name, lon_name)
+
+            times = pd.to_datetime(data["time"].values).normalize()
+            for chunk_start in range(0, len(times), DAYS_PER_CHUNK):
+                chunk = data.isel(time=slice(chunk_start, chunk_start + DAYS_PER_CHUNK))
+                values = np.asarray(chunk.values, dtype=np.float64).reshape(chunk.sizes["time"], -1)
+                yield grid, list(times[chunk_start:chunk_start + DAYS_PER_CHUNK]), values
+
+
+def retrieve_offline_zonal_means(
+    province_gdf,
+    start_date: str,
+    end_date: str,
+    dataset: str,
+    variable: Optional[str] = None,
+    convert: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+    missing_value: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    Compute daily commune means from local rasters, without Earth Engine.
+
+    Reads <OFFLINE_RASTER_ROOT>/<dataset>/ (daily GeoTIFFs with a date in the filename,
+    or NetCDF files with a time dimension). Each chunk of days is reduced with one
+    sparse (commune x pixel) by dense (pixel x day) product. Pixels are weighted by the
+    area they share with the commune polygon. Nodata pixels are left out of both the
+    sum and the weights.
+
+    Args:
+    - province_gdf: GeoDataFrame containing the commune geometries.
+    - start_date: The start date in the format 'YYYY-MM-DD'.
+    - end_date: The end date in the format 'YYYY-MM-DD' (exclusive).
+    - dataset: Sub-folder of the offline raster root holding the rasters (e.g. "precipitation").
+    - variable: NetCDF variable to read (defaults to the first data variable).
+    - convert: Optional function applied to the commune value columns (e.g. unit conversion).
+    - missing_value: Optional value for dates where a commune has no data.
+
+    Returns:
+    - DataFrame with a 'Date' column ('YYYY-MM-DD') and one column per commune,
+      in the layout of weather.zonal_stats.retrieve_zonal_means.
+    """
+    folder = os.path.join(get_offline_raster_root(), dataset)
+    if not os.path.isdir(folder):
+        raise FileNotFoundError(f"No offline rasters for '{dataset}': {folder} does not exist")
+
+    communes = ordered_communes(province_gdf)
+    columns = [column_name for column_name, _ in communes]
+    if not communes:
+        return pd.DataFrame(columns=["Date"])
+
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    # Read only the pixels around the whole country so the shared weight matrix fits every province
+    bounds = tuple(get_communes_geodataframe().total_bounds)
+
+    geotiffs = _dated_geotiffs(folder, start, end)
+    if geotiffs:
+        chunks = _read_geotiff_days(geotiffs, bounds)
+    else:
+        netcdfs = glob.glob(os.path.join(folder, "*.nc"))
+        if not netcdfs:
+            raise FileNotFoundError(f"No GeoTIFF or NetCDF rasters found in {folder}")
+        chunks = _read_netcdf_days(netcdfs, variable, start, end, bounds)
+
+    frames = []
+    for grid, dates, values in chunks:
+        matrix, column_rows = get_commune_weight_matrix(grid)
+        rows = [column_rows[column_name] for column_name in columns]
+        weights = matrix[rows]
+
+        valid = ~np.isnan(values)
+        sums = weights @ np.where(valid, values, 0.0).T
+        covered = weights @ valid.T.astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(covered > 0, sums / covered, np.nan)
+        frames.append(pd.DataFrame(means.T, index=pd.DatetimeIndex(dates), columns=columns))
+
+    if not frames:
+        return pd.DataFrame(columns=["Date"] + columns)
+
+    result_df = pd.concat(frames).sort_index()
+    result_df = result_df[~result_df.index.duplicated(keep="first")]
+    # Dates where no commune has data are dropped, as reduceRegions returns no rows for them
+    result_df = result_df.dropna(how="all")
+    if convert is not None:
+        result_df = convert(result_df)
+    if missing_value is not None:
+        result_df = result_df.fillna(missing_value)
+    result_df.index = result_df.index.strftime("%Y-%m-%d")
+    result_df.index.name = "Date"
+    return result_df.reset_index()
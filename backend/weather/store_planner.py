@@ -0,0 +1,244 @@
+# backend/weather/store_planner.py
+
+import os
+import fcntl
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from countries.cambodia import ordered_communes, province_to_filename, to_climate_column_name
+from services.climate_store import get_parquet_path, load_climate_data
+from services.climatology import schedule_climatology_rebuild
+
+# Date ranges are (start 'YYYY-MM-DD', end 'YYYY-MM-DD' exclusive), as passed to filterDate
+DateRange = Tuple[str, str]
+
+
+@contextmanager
+def _store_write_lock(path: str):
+    """
+    Exclusive lock on a province store file for its read-merge-replace.
+
+    An flock() on a lock file beside the Parquet file, so write-backs from different
+    worker processes on the same host are serialised too (the Parquet file itself is
+    replaced, so it cannot carry the lock).
+    """
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _missing_date_ranges(missing: np.ndarray, dates: pd.DatetimeIndex) -> Tuple[DateRange, ...]:
+    """Collapse a boolean "missing" mask over consecutive days into date ranges."""
+    if not missing.any():
+        return ()
+    padded = np.concatenate(([False], missing, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return tuple(
+        (
+            dates[start].strftime("%Y-%m-%d"),
+            (dates[end - 1] + timedelta(days=1)).strftime("%Y-%m-%d")
+        )
+        for start, end in zip(edges[::2], edges[1::2])
+    )
+
+
+def plan_store_coverage(
+    store_df: Optional[pd.DataFrame],
+    columns: List[str],
+    start_date: str,
+    end_date: str
+) -> Dict[Tuple[DateRange, ...], List[str]]:
+    """
+    Work out which (commune column, date range) pairs the local store cannot answer.
+
+    A day counts as covered for a column when the store has a non-null value for it;
+    columns absent from the store are missing over the whole request.
+
+    Args:
+        store_df: Province frame from the climate store (Date + commune columns), or None
+        columns: Requested climate column names
+        start_date: Start date 'YYYY-MM-DD'
+        end_date: End date 'YYYY-MM-DD' (exclusive)
+
+    Returns:
+        Dict mapping a tuple of missing date ranges to the columns sharing exactly
+        those gaps. Fully covered columns are omitted.
+    """
+    dates = pd.date_range(start_date, pd.Timestamp(end_date) - timedelta(days=1), freq="D")
+    if len(dates) == 0:
+        return {}
+
+    if store_df is not None:
+        requested = store_df[(store_df["Date"] >= dates[0]) & (store_df["Date"] <= dates[-1])]
+        requested = requested.drop_duplicates("Date").set_index("Date").reindex(dates)
+    else:
+        requested = None
+
+    plan: Dict[Tuple[DateRange, ...], List[str]] = {}
+    full_range = ((dates[0].strftime("%Y-%m-%d"), (dates[-1] + timedelta(days=1)).strftime("%Y-%m-%d")),)
+    for column in columns:
+        if requested is None or column not in requested.columns:
+            gaps = full_range
+        else:
+            gaps = _missing_date_ranges(requested[column].isna().to_numpy(), dates)
+        if gaps:
+            plan.setdefault(gaps, []).append(column)
+    return plan
+
+
+def _writable_dates(dates: pd.DatetimeIndex, store_start: pd.Timestamp, store_end: pd.Timestamp) -> np.ndarray:
+    """
+    Mask of fetched dates that may be merged into a store spanning store_start..store_end.
+
+    Dates inside the existing span are always writable. Outside it only complete calendar
+    years are added, because the premium calculations take the last N years of the store
+    and a partial year would shift that window.
+    """
+    writable = (dates >= store_start) & (dates <= store_end)
+    outside = dates[~writable]
+    for year in outside.year.unique():
+        in_year = dates.year == year
+        if in_year.sum() == pd.Timestamp(year=year, month=12, day=31).dayofyear:
+            writable |= in_year
+    return np.asarray(writable)
+
+
+def write_back_to_store(normalized_province: str, data_type: str, fetched_df: pd.DataFrame) -> bool:
+    """
+    Merge newly fetched values into an existing province Parquet file.
+
+    Existing store values win; fetched values only fill missing days, or add whole
+    calendar years outside the stored span (see _writable_dates). A commune missing from
+    the file is only added when the fetch covers the file's whole date span; otherwise
+    its column would be NaN for every other year, which the premium calculations would
+    read as years without rain. Such communes are still served, just not written back.
+    The file is rewritten atomically (temporary file + os.replace) under a file lock, so
+    readers never see a partial file and concurrent workers do not lose each other's
+    days. The climate store cache and data_version follow the file on its next access;
+    the province's climatology table is rebuilt by a background task. Provinces
+    without a Parquet file are left alone, since a partial file would otherwise stand in
+    for the full history.
+
+    Returns:
+        True if the store file was updated
+    """
+    path = get_parquet_path(normalized_province, data_type)
+    if fetched_df.empty or not os.path.exists(path):
+        return False
+
+    fetched = fetched_df.copy()
+    fetched["Date"] = pd.to_datetime(fetched["Date"])
+    fetched = fetched.set_index("Date")
+
+    with _store_write_lock(path):
+        # Re-read under the lock so concurrent write-backs are not lost
+        store = pd.read_parquet(path).set_index("Date")
+        # New communes need their whole history, not only the requested range
+        partial_columns = [
+            column for column in fetched.columns
+            if column not in store.columns and not store.index.isin(fetched.index).all()
+        ]
+        if partial_columns:
+            print(f"[INFO] Not writing back {len(partial_columns)} new commune(s) fetched for part of "
+                  f"the stored span only: {partial_columns}")
+            fetched = fetched.drop(columns=partial_columns)
+        fetched = fetched[_writable_dates(fetched.index, store.index.min(), store.index.max())]
+        if fetched.empty or fetched.columns.empty:
+            return False
+        merged = store.combine_first(fetched)
+        merged = merged[list(store.columns) + [c for c in fetched.columns if c not in store.columns]]
+        merged = merged.sort_index().reset_index()
+
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        merged.to_parquet(temp_path, engine="pyarrow", index=False, compression="snappy")
+        os.replace(temp_path, path)
+
+    print(f"[INFO] Wrote {len(fetched)} fetched days back to climate store: {path}")
+    schedule_climatology_rebuild(normalized_province, data_type)
+    return True
+
+
+def retrieve_with_climate_store(
+    province: str,
+    province_gdf,
+    data_type: str,
+    start_date: str,
+    end_date: str,
+    retrieve: Callable[..., pd.DataFrame]
+) -> pd.DataFrame:
+    """
+    Answer a retrieval from the local climate store, fetching only the gaps.
+
+    The province's store file is consulted first; communes and date ranges it does not
+    cover are retrieved with `retrieve` (grouped by identical gaps, so communes with the
+    same coverage share requests) and written back to the store.
+
+    Args:
+        province: Canonical province name (e.g., "Banteay Meanchey")
+        province_gdf: GeoDataFrame with the selected commune geometries
+        data_type: "precipitation" or "temperature"
+        start_date: Start date 'YYYY-MM-DD'
+        end_date: End date 'YYYY-MM-DD' (exclusive)
+        retrieve: Retrieval function called as retrieve(province_gdf, start_date, end_date)
+
+    Returns:
+        DataFrame with a 'Date' column ('YYYY-MM-DD') and one column per commune,
+        in the same layout as `retrieve`
+    """
+    normalized_province = province_to_filename(province)
+    try:
+        store_df = load_climate_data(normalized_province, data_type)
+    except FileNotFoundError:
+        store_df = None
+
+    row_columns = [
+        to_climate_column_name(district, commune)
+        for district, commune in zip(province_gdf["NAME_2"], province_gdf["NAME_3"])
+    ]
+    # Column order of the retrieval functions: communes grouped by district
+    columns = list(dict.fromkeys(column_name for column_name, _ in ordered_communes(province_gdf)))
+
+    plan = plan_store_coverage(store_df, columns, start_date, end_date)
+    missing_days = sum(
+        (pd.Timestamp(end) - pd.Timestamp(start)).days * len(group)
+        for gaps, group in plan.items() for start, end in gaps
+    )
+    total_days = max(0, (pd.Timestamp(end_date) - pd.Timestamp(start_date)).days) * len(columns)
+    print(f"[INFO] Climate store covers {total_days - missing_days}/{total_days} commune-days for {province}")
+
+    # Local portion
+    if store_df is not None:
+        local_columns = [c for c in columns if c in store_df.columns]
+        in_range = (store_df["Date"] >= pd.Timestamp(start_date)) & (store_df["Date"] < pd.Timestamp(end_date))
+        result = store_df.loc[in_range, ["Date"] + local_columns].set_index("Date")
+    else:
+        result = pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+
+    # Remote portion: one retrieval per (gap range, commune group)
+    fetched_frames = []
+    for gaps, group in plan.items():
+        group_set = set(group)
+        group_gdf = province_gdf[[column in group_set for column in row_columns]]
+        for gap_start, gap_end in gaps:
+            print(f"[INFO] Fetching {len(group)} communes from GEE for {gap_start} to {gap_end}")
+            gap_df = retrieve(group_gdf, gap_start, gap_end)
+            if gap_df is not None and not gap_df.empty:
+                gap_df = gap_df.copy()
+                gap_df["Date"] = pd.to_datetime(gap_df["Date"])
+                fetched_frames.append(gap_df.set_index("Date"))
+
+    if fetched_frames:
+        # Gap frames cover disjoint (commune, date) cells; stack them and take the first value per cell
+        fetched = pd.concat(fetched_frames).groupby(level=0).first()
+        result = result.combine_first(fetched)
+        write_back_to_store(normalized_province, data_type, fetched.reset_index())
+
+    result = result.reindex(columns=columns).sort_index()
+    result.index = result.index.strftime("%Y-%m-%d")
+    result.index.name = "Date"
+    return result.reset_index()
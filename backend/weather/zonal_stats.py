@@ -0,0 +1,314 @@
+# backend/weather/zonal_stats.py
+
+import os
+import threading
+import ee
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from countries.cambodia import ordered_communes
+from weather.gee_executor import GeeRequestExecutor, get_gee_executor
+
+# Retrieval mode used by weather.datasets.retrieve_datasets:
+# "reduce_regions" reduces all communes per image in one request,
+# "per_commune" issues one request per commune and date batch (original behaviour),
+# "offline" reduces local rasters (see weather.offline_zonal).
+DEFAULT_RETRIEVAL_MODE = os.getenv("GEE_RETRIEVAL_MODE", "reduce_regions")
+
+# Upper bound on (commune, day) values returned by a single getInfo() call
+MAX_VALUES_PER_REQUEST = int(os.getenv("GEE_MAX_VALUES_PER_REQUEST", "100000"))
+
+
+# Boundaries are simplified per commune (topology preserved) to this fraction of the
+# reduction scale before being sent to GEE. A commune whose area would change by more than
+# SIMPLIFY_MAX_AREA_CHANGE is retried at half the tolerance (up to SIMPLIFY_ATTEMPTS
+# times), then sent unsimplified. The communes do not form a clean coverage (neighbouring
+# boundaries were digitised separately), so shared borders are not simplified jointly.
+# Measured on the 1,630 Cambodia communes at the 5 km dataset scale (250 m tolerance):
+# 64,485 -> 46,619 vertices (-27.7%), serialised payload -27.1%, Kampong Cham
+# 2,790 -> 2,324; commune area change at most 0.5%, mean 0.15%. Plain simplification
+# without the area limit moves small communes by up to 60% at this tolerance.
+SIMPLIFY_FRACTION_OF_SCALE = float(os.getenv("GEE_SIMPLIFY_FRACTION", "0.05"))
+SIMPLIFY_MAX_AREA_CHANGE = float(os.getenv("GEE_SIMPLIFY_MAX_AREA_CHANGE", "0.005"))
+SIMPLIFY_ATTEMPTS = 3
+METERS_PER_DEGREE = 111320.0
+
+# Serialised simplified commune geometries per tolerance, keyed by (column_name, id(geometry)).
+# Built once from the national boundaries layer, whose geometry objects live for the
+# whole process and are shared by every province selection.
+_ee_geometry_json_cache: Dict[float, Dict[Tuple[str, int], dict]] = {}
+_ee_geometry_json_lock = threading.Lock()
+
+
+def simplify_tolerance(scale: int) -> float:
+    """Simplification tolerance in degrees for a reduction scale in meters."""
+    return scale * SIMPLIFY_FRACTION_OF_SCALE / METERS_PER_DEGREE
+
+
+def _exterior_geojson(geometry) -> dict:
+    """GeoJSON-style dict of a Polygon/MultiPolygon's exterior rings."""
+    if geometry.geom_type == "MultiPolygon":
+        return {
+            "type": "MultiPolygon",
+            "coordinates": [[[list(xy) for xy in poly.exterior.coords]] for poly in geometry.geoms]
+        }
+    return {"type": "Polygon", "coordinates": [[list(xy) for xy in geometry.exterior.coords]]}
+
+
+def to_ee_geometry(geometry_json: dict) -> ee.Geometry:
+    """Build an Earth Engine geometry from a dict produced by prepare_ee_geometries."""
+    if geometry_json["type"] == "MultiPolygon":
+        return ee.Geometry.MultiPolygon(geometry_json["coordinates"])
+    return ee.Geometry.Polygon(geometry_json["coordinates"])
+
+
+def simplify_communes(geometries: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplify commune polygons one by one, keeping each within SIMPLIFY_MAX_AREA_CHANGE.
+
+    Communes that change too much are retried at half the tolerance; those still over
+    the limit after SIMPLIFY_ATTEMPTS tries are returned unchanged.
+    """
+    import shapely
+
+    result = geometries.copy()
+    if tolerance <= 0 or not len(geometries):
+        return result
+    areas = shapely.area(geometries)
+    pending = np.arange(len(geometries))
+    for _ in range(SIMPLIFY_ATTEMPTS):
+        simplified = shapely.simplify(geometries[pending], tolerance, preserve_topology=True)
+        change = np.abs(shapely.area(simplified) - areas[pending]) / np.maximum(areas[pending], 1e-300)
+        within = change <= SIMPLIFY_MAX_AREA_CHANGE
+        result[pending[within]] = simplified[within]
+        pending = pending[~within]
+        if not len(pending):
+            break
+        tolerance /= 2
+    return result
+
+
+def _national_geometry_json(tolerance: float) -> Dict[Tuple[str, int], dict]:
+    """Serialised simplified geometries of every commune in the boundaries layer (built once per tolerance)."""
+    cached = _ee_geometry_json_cache.get(tolerance)
+    if cached is not None:
+        return cached
+
+    with _ee_geometry_json_lock:
+        if tolerance not in _ee_geometry_json_cache:
+            from countries.cambodia import get_communes_geodataframe
+
+            communes = ordered_communes(get_communes_geodataframe())
+            geometries = np.asarray([geometry for _, geometry in communes], dtype=object)
+            simplified = simplify_communes(geometries, tolerance)
+            _ee_geometry_json_cache[tolerance] = {
+                (column_name, id(geometry)): _exterior_geojson(simplified_geometry)
+                for (column_name, geometry), simplified_geometry in zip(communes, simplified)
+            }
+        return _ee_geometry_json_cache[tolerance]
+
+
+def prepare_ee_geometries(communes: List[Tuple[str, object]], scale: int) -> List[ee.Geometry]:
+    """
+    Earth Engine geometries for (column name, shapely geometry) pairs, simplified for `scale`.
+
+    Boundaries are simplified per commune to a tolerance below the reduction scale,
+    within an area-change limit (see SIMPLIFY_FRACTION_OF_SCALE), so request payloads
+    shrink while the means barely change. The national layer is simplified once per
+    tolerance and looked up per commune; geometries from elsewhere are simplified on
+    the fly.
+    """
+    tolerance = simplify_tolerance(scale)
+    national = _national_geometry_json(tolerance)
+
+    geometry_jsons = []
+    for column_name, geometry in communes:
+        geometry_json = national.get((column_name, id(geometry)))
+        if geometry_json is None:
+            geometry_json = _exterior_geojson(simplify_communes(np.asarray([geometry], dtype=object), tolerance)[0])
+        geometry_jsons.append(geometry_json)
+    return [to_ee_geometry(geometry_json) for geometry_json in geometry_jsons]
+
+
+def get_day_batches(start_date: str, end_date: str, days_per_batch: int) -> List[Tuple[str, str]]:
+    """Split a date range into batches of at most `days_per_batch` days (end exclusive)."""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+
+    batches = []
+    current_start = start
+    while current_start < end:
+        batch_end = min(current_start + timedelta(days=days_per_batch), end)
+        batches.append((
+            current_start.strftime("%Y-%m-%d"),
+            batch_end.strftime("%Y-%m-%d")
+        ))
+        current_start = batch_end
+
+    return batches
+
+
+def _band_frames(values: Dict[str, Dict[str, Dict[str, float]]], bands: List[str], columns: List[str]) -> Dict[str, pd.DataFrame]:
+    """Build one wide Date x commune frame per band from {band: {column: {date: value}}}."""
+    frames = {}
+    for band in bands:
+        result_df = pd.DataFrame(values[band], columns=list(dict.fromkeys(columns))).sort_index()
+        result_df.index.name = "Date"
+        frames[band] = result_df
+    return frames
+
+
+def retrieve_zonal_means(
+    province_gdf,
+    start_date: str,
+    end_date: str,
+    collection_id: str,
+    bands: List[str],
+    scale: int = 5000,
+    reducer: str = "mean",
+    executor: Optional[GeeRequestExecutor] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Retrieve daily commune means for every commune in one request per date batch.
+
+    All selected communes are sent as a single FeatureCollection and each image is
+    reduced with `reduceRegions`, so the number of round trips depends on the date
+    range and commune count only through MAX_VALUES_PER_REQUEST, not once per commune.
+    Several bands of the same collection are reduced in the same pass.
+
+    Args:
+    - province_gdf: GeoDataFrame containing the commune geometries.
+    - start_date: The start date in the format 'YYYY-MM-DD'.
+    - end_date: The end date in the format 'YYYY-MM-DD' (exclusive).
+    - collection_id: Earth Engine ImageCollection ID.
+    - bands: Bands to reduce.
+    - scale: Reduction scale in meters.
+    - reducer: Name of a single-output ee.Reducer (e.g. "mean", "max").
+    - executor: Optional GeeRequestExecutor; defaults to one configured from the environment.
+
+    Returns:
+    - Dict of band -> DataFrame indexed by Date ('YYYY-MM-DD') with one column per commune,
+      in source units.
+    """
+    communes = ordered_communes(province_gdf)
+    columns = [column_name for column_name, _ in communes]
+    if not communes:
+        return _band_frames({band: {} for band in bands}, bands, columns)
+
+    features = ee.FeatureCollection([
+        ee.Feature(geometry, {"column": column_name})
+        for (column_name, _), geometry in zip(communes, prepare_ee_geometries(communes, scale))
+    ])
+    # Name the outputs after the bands (a single-band reduction would otherwise be called e.g. "mean")
+    ee_reducer = getattr(ee.Reducer, reducer)()
+    if len(bands) == 1:
+        ee_reducer = ee_reducer.setOutputs(bands)
+
+    def reduce_image(image):
+        date = image.date().format("YYYY-MM-dd")
+        return (
+            image.reduceRegions(collection=features, reducer=ee_reducer, scale=scale)
+            .filter(ee.Filter.notNull(bands))
+            .map(lambda feature: feature.set("date", date))
+        )
+
+    days_per_batch = max(1, MAX_VALUES_PER_REQUEST // (len(communes) * len(bands)))
+    date_batches = get_day_batches(start_date, end_date, days_per_batch)
+    print(f"[INFO] Reducing {len(communes)} communes x {len(bands)} band(s) over {len(date_batches)} date batches")
+
+    def build_request(batch_start, batch_end):
+        images = ee.ImageCollection(collection_id).filterDate(batch_start, batch_end).select(bands)
+        computation = (
+            images.map(reduce_image)
+            .flatten()
+            .reduceColumns(ee.Reducer.toList(2 + len(bands)), ["date", "column"] + bands)
+            .get("list")
+        )
+        return lambda: computation.getInfo()
+
+    if executor is None:
+        executor = get_gee_executor()
+    batch_results = executor.map([
+        build_request(batch_start, batch_end) for batch_start, batch_end in date_batches
+    ])
+
+    # Scatter long (date, column, band values...) rows into per-band columns
+    values = {band: {} for band in bands}
+    for batch_rows in batch_results:
+        for row in batch_rows:
+            date, column_name = row[0], row[1]
+            for band, value in zip(bands, row[2:]):
+                values[band].setdefault(column_name, {}).setdefault(date, value)
+    return _band_frames(values, bands, columns)
+
+
+def retrieve_commune_means(
+    province_gdf,
+    start_date: str,
+    end_date: str,
+    collection_id: str,
+    bands: List[str],
+    scale: int = 5000,
+    reducer: str = "mean",
+    executor: Optional[GeeRequestExecutor] = None,
+    days_per_batch: int = 3650
+) -> Dict[str, pd.DataFrame]:
+    """
+    Retrieve daily commune means with one `reduceRegion` request per commune and date batch.
+
+    Same arguments and result as retrieve_zonal_means; kept for comparison and as a
+    fallback when a single reduceRegions request is too large.
+    """
+    if executor is None:
+        executor = get_gee_executor()
+
+    date_batches = get_day_batches(start_date, end_date, days_per_batch)
+    print(f"[INFO] Processing {len(date_batches)} date batches")
+    output_names = [f"mean_{band}" for band in bands]
+
+    def build_request(commune_geometry, batch_start, batch_end):
+        images = (
+            ee.ImageCollection(collection_id)
+            .filterDate(batch_start, batch_end)
+            .select(bands)
+        )
+
+        # Extract the data for each date using `reduceRegion`
+        def extract_daily_data(image):
+            means = image.reduceRegion(
+                reducer=getattr(ee.Reducer, reducer)(),
+                geometry=commune_geometry,
+                scale=scale,
+                maxPixels=1e13,
+            )
+            return image.set("date", image.date().format("YYYY-MM-dd")).set(
+                ee.Dictionary(means).rename(bands, output_names, True)
+            )
+
+        computation = images.map(extract_daily_data)
+        return lambda: computation.getInfo()
+
+    # Build one request per commune and date batch, grouped by district
+    communes = ordered_communes(province_gdf)
+    columns = [column_name for column_name, _ in communes]
+    requests = [
+        build_request(commune_geometry, batch_start, batch_end)
+        for commune_geometry in prepare_ee_geometries(communes, scale)
+        for batch_start, batch_end in date_batches
+    ]
+
+    print(f"[INFO] Running {len(requests)} requests for {len(columns)} communes")
+    time_series_list = executor.map(requests)
+
+    # Collect each commune's daily values across batches, then build the frames once
+    values = {band: {} for band in bands}
+    for commune_idx, column_name in enumerate(columns):
+        batch_results = time_series_list[commune_idx * len(date_batches):(commune_idx + 1) * len(date_batches)]
+        for time_series in batch_results:
+            for entry in time_series["features"]:
+                properties = entry["properties"]
+                for band, output_name in zip(bands, output_names):
+                    if output_name in properties:
+                        values[band].setdefault(column_name, {})[properties["date"]] = properties[output_name]
+    return _band_frames(values, bands, columns)
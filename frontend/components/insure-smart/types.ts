@@ -43,4 +43,5 @@ export interface OptimizationResult {
   coverage_penalty?: number;
   periods_with_no_payouts?: number;
   payout_years?: number;
+  dataVersion?: string;
 }
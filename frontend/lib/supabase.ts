@@ -820,6 +820,17 @@ export interface WeatherDownload {
   date_end: string
   status: 'queued' | 'running' | 'completed' | 'failed'
   file_url?: string
+  file_path?: string
+  output_format?: 'xlsx' | 'parquet' | 'csv.gz' | 'arrow'
+  progress?: {
+    communes_done: number
+    communes_total: number
+    batches_done: number
+    units_done: number
+    units_total: number
+    percent: number
+    eta_seconds: number | null
+  }
   error_message?: string
   created_at: string
   updated_at: string